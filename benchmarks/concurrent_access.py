@@ -0,0 +1,92 @@
+"""Benchmark of concurrent reads and writes on the SQLite database, as done by the website
+reading recent exposes while a hunt saves new ones. Compares journal modes.
+
+Run from the repository root with:
+
+    python -m benchmarks.concurrent_access
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from database.idmaintainer import IdMaintainer
+from flathunter.config import YamlConfig
+
+DESCRIPTION = 'Benchmark of concurrent reads and writes on the SQLite database'
+
+
+def make_expose(expose_id):
+    """Build a dummy expose"""
+    return {'id': expose_id, 'crawler': 'Immowelt', 'title': f'Flat {expose_id}',
+            'price': '900 EUR', 'size': '60 m²', 'rooms': '2', 'address': 'Berlin',
+            'url': f'https://www.immowelt.de/expose/{expose_id}'}
+
+
+def run(settings, duration, readers, batch_size):
+    """Run one writer and a number of readers for 'duration' seconds. Returns the number
+       of exposes written, the number of reads, and the number of failed operations"""
+    config = YamlConfig({'sqlite': settings})
+    counts = {'writes': 0, 'reads': 0, 'errors': 0}
+    lock = threading.Lock()
+    with tempfile.TemporaryDirectory() as database_dir:
+        id_watch = IdMaintainer(os.path.join(database_dir, 'processed_ids.db'), config)
+        id_watch.save_exposes([make_expose(expose_id) for expose_id in range(100)])
+        deadline = time.monotonic() + duration
+
+        def write():
+            next_id = 100
+            while time.monotonic() < deadline:
+                try:
+                    id_watch.save_exposes([make_expose(expose_id) for expose_id
+                                           in range(next_id, next_id + batch_size)])
+                    with lock:
+                        counts['writes'] += batch_size
+                    next_id += batch_size
+                except sqlite3.OperationalError:
+                    with lock:
+                        counts['errors'] += 1
+
+        def read():
+            while time.monotonic() < deadline:
+                try:
+                    id_watch.get_recent_exposes(10)
+                    with lock:
+                        counts['reads'] += 1
+                except sqlite3.OperationalError:
+                    with lock:
+                        counts['errors'] += 1
+
+        threads = [threading.Thread(target=write)] + \
+                  [threading.Thread(target=read) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return counts
+
+
+def main():
+    """Run the benchmark with the rollback journal and with WAL"""
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=20)
+    args = parser.parse_args()
+
+    variants = {
+        'rollback journal': {'journal_mode': 'delete', 'synchronous': 'full',
+                             'mmap_size': 0, 'cache_size': 2000, 'busy_timeout': 1},
+        'wal (defaults)': {'busy_timeout': 1},
+    }
+    print(f"{'settings':<18} {'writes/s':>10} {'reads/s':>10} {'errors':>8}")
+    for (name, settings) in variants.items():
+        counts = run(settings, args.duration, args.readers, args.batch_size)
+        print(f"{name:<18} {counts['writes'] / args.duration:>10.0f} "
+              f"{counts['reads'] / args.duration:>10.0f} {counts['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Benchmark of the codecs for exposes stored in the SQLite database: stored size, and the
+time to read and decode a page of recent exposes.
+
+Run from the repository root with:
+
+    python -m benchmarks.expose_codecs
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from database.expose_codec import ENCODERS
+from database.idmaintainer import IdMaintainer
+from flathunter.config import YamlConfig
+
+DESCRIPTION = 'Benchmark of the codecs for exposes stored in the SQLite database'
+
+
+def make_expose(expose_id):
+    """Build a dummy expose, with text and image lists like the crawlers return"""
+    return {'id': expose_id, 'crawler': 'Immobilienscout',
+            'title': f'Helle 2-Zimmer-Wohnung mit Balkon und Einbauküche {expose_id}',
+            'price': '1.150 €', 'size': '62,5 m²', 'rooms': '2', 'address': 'Berlin, Neukölln',
+            'url': f'https://www.immobilienscout24.de/expose/{expose_id}',
+            'image': f'https://pictures.immobilienscout24.de/listings/{expose_id}-0.jpg',
+            'images': [f'https://pictures.immobilienscout24.de/listings/{expose_id}-{n}.jpg'
+                       for n in range(8)]}
+
+
+def main():
+    """Store the same exposes with each codec, and print size and read times"""
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument('--exposes', type=int, default=20_000)
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--reads', type=int, default=20)
+    args = parser.parse_args()
+
+    exposes = [make_expose(expose_id) for expose_id in range(args.exposes)]
+    print(f"{'codec':<8} {'file MB':>8} {'bytes/expose':>13} {'page read ms':>13}")
+    for codec in ENCODERS:
+        with tempfile.TemporaryDirectory() as database_dir:
+            db_name = os.path.join(database_dir, 'processed_ids.db')
+            id_watch = IdMaintainer(db_name, YamlConfig({'sqlite': {'expose_codec': codec}}))
+            id_watch.save_exposes(exposes)
+            (stored,) = id_watch.get_connection().execute(
+                'SELECT SUM(LENGTH(details)) FROM exposes').fetchone()
+            id_watch.get_connection().execute('VACUUM')
+            start = time.perf_counter()
+            for _ in range(args.reads):
+                id_watch.get_recent_exposes(args.page_size)
+            read_ms = (time.perf_counter() - start) / args.reads * 1e3
+            print(f"{codec:<8} {os.path.getsize(db_name) / 1e6:>8.1f} "
+                  f"{stored / args.exposes:>13.0f} {read_ms:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark of processed-ID lookups as the table grows: in the SQLite database, and in the
+in-memory cache of processed IDs.
+
+Run from the repository root with:
+
+    python -m benchmarks.processed_ids
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from database.idmaintainer import IdMaintainer
+from database.seen_cache import SeenIdCache
+
+DESCRIPTION = 'Benchmark of processed-ID lookups in SQLite and in the cache as the table grows'
+
+CRAWLERS = ['Immobilienscout', 'Immowelt', 'WgGesucht', 'Kleinanzeigen']
+
+
+def fill(id_watch, first_id, count):
+    """Insert 'count' processed IDs, spread over the crawlers"""
+    connection = id_watch.get_connection()
+    connection.executemany('INSERT OR IGNORE INTO processed (id, crawler) VALUES (?, ?)',
+                           [(expose_id, CRAWLERS[expose_id % len(CRAWLERS)])
+                            for expose_id in range(first_id, first_id + count)])
+    connection.commit()
+
+
+def time_lookups(lookup, ids):
+    """Average time in microseconds of a lookup call"""
+    start = time.perf_counter()
+    for expose_id in ids:
+        lookup(expose_id, CRAWLERS[expose_id % len(CRAWLERS)])
+    return (time.perf_counter() - start) / len(ids) * 1e6
+
+
+def time_database_lookups(id_watch, ids):
+    """Average time of an 'is_processed' call answered by SQLite. The maintainer gets an
+       empty cache, so no lookup is short-circuited by it"""
+    id_watch.seen_cache = SeenIdCache(lambda: [])
+    return time_lookups(id_watch.is_processed, ids)
+
+
+def time_cache_lookups(id_watch, ids):
+    """Time in milliseconds to load a fresh cache from the table, and the average time
+       of a lookup in it"""
+    cache = SeenIdCache(id_watch.get_processed_ids)
+    start = time.perf_counter()
+    cache.warm()
+    warm_time = (time.perf_counter() - start) * 1e3
+    return (warm_time, time_lookups(cache.contains, ids))
+
+
+def main():
+    """Grow the processed table and print the lookup cost at each size"""
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1_000, 10_000, 100_000, 500_000])
+    parser.add_argument('--lookups', type=int, default=5_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as database_dir:
+        id_watch = IdMaintainer(os.path.join(database_dir, 'processed_ids.db'))
+        table_size = 0
+        print(f"{'rows':>10} {'db us/lookup':>14} {'cache us/lookup':>16} {'cache load ms':>14}")
+        for size in sorted(args.sizes):
+            fill(id_watch, table_size, size - table_size)
+            table_size = size
+            # half of the looked up IDs are in the table
+            ids = [random.randrange(table_size * 2) for _ in range(args.lookups)]
+            database_time = time_database_lookups(id_watch, ids)
+            (warm_time, cache_time) = time_cache_lookups(id_watch, ids)
+            print(f"{table_size:>10} {database_time:>14.2f} {cache_time:>16.2f} "
+                  f"{warm_time:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
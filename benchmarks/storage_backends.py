@@ -0,0 +1,88 @@
+"""Benchmark of the storage back-ends, running the same hunt workload against each.
+
+Run from the repository root with:
+
+    python -m benchmarks.storage_backends
+
+To include Firestore, start the emulator (gcloud emulators firestore start) and pass
+its address with --firestore-emulator localhost:8200.
+"""
+import argparse
+import logging
+import os
+import random
+import re
+import tempfile
+import time
+
+from database.googlecloud_idmaintainer import GoogleCloudIdMaintainer
+from database.idmaintainer import IdMaintainer
+from database.memory_storage import MemoryStorage
+from flathunter.abstract_crawler import Crawler
+from flathunter.config import YamlConfig
+from flathunter.hunter import Hunter
+from flathunter.logging import logger
+
+DESCRIPTION = 'Benchmark of the storage back-ends, running the same hunt workload against each'
+
+
+class SyntheticCrawler(Crawler):
+    """Crawler returning random exposes, most of them already seen in earlier hunts"""
+
+    URL_PATTERN = re.compile(r'https://www\.example\.com')
+
+    def __init__(self, config, exposes_per_hunt, id_range):
+        super().__init__(config)
+        self.exposes_per_hunt = exposes_per_hunt
+        self.id_range = id_range
+        self.random = random.Random(1)
+
+    def get_results(self, *_args, **_kwargs):
+        """Draw a page of random exposes"""
+        return [{'id': expose_id, 'url': f'https://www.example.com/expose/{expose_id}',
+                 'title': f'Flat {expose_id}', 'price': f'{self.random.randint(300, 3000)} EUR',
+                 'size': f'{self.random.randint(15, 150)} m²', 'rooms': '2',
+                 'address': 'Berlin', 'crawler': self.get_name()}
+                for expose_id in self.random.sample(range(self.id_range), self.exposes_per_hunt)]
+
+
+def run(storage, hunts, exposes_per_hunt, id_range):
+    """Run the hunts against a storage back-end, and return the seconds per hunt"""
+    config = YamlConfig({'urls': ['https://www.example.com/search']})
+    config.set_searchers([SyntheticCrawler(config, exposes_per_hunt, id_range)])
+    hunter = Hunter(config, storage)
+    start = time.perf_counter()
+    for _ in range(hunts):
+        hunter.hunt_flats()
+        storage.update_last_run_time()
+        storage.get_recent_exposes(9)
+    return (time.perf_counter() - start) / hunts
+
+
+def main():
+    """Run the workload against each back-end and print the time per hunt"""
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument('--hunts', type=int, default=20)
+    parser.add_argument('--exposes', type=int, default=200, help='Exposes per hunt')
+    parser.add_argument('--id-range', type=int, default=5000)
+    parser.add_argument('--firestore-emulator', help='host:port of a Firestore emulator')
+    args = parser.parse_args()
+    logger.setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as database_dir:
+        backends = {
+            'memory': MemoryStorage,
+            'sqlite': lambda: IdMaintainer(os.path.join(database_dir, 'processed_ids.db'),
+                                           YamlConfig()),
+        }
+        if args.firestore_emulator:
+            backends['firestore'] = lambda: GoogleCloudIdMaintainer(
+                YamlConfig({'firestore_emulator_host': args.firestore_emulator}))
+        print(f"{'backend':<10} {'ms/hunt':>10}")
+        for (name, make_storage) in backends.items():
+            seconds = run(make_storage(), args.hunts, args.exposes, args.id_range)
+            print(f"{name:<10} {seconds * 1e3:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,7 @@
 import os
 
 from flathunter.argument_parser import parse
-from database.googlecloud_idmaintainer import GoogleCloudIdMaintainer
+from database.backends import create_storage
 from flathunter.web_hunter import WebHunter
 from flathunter.config import Config
 from flathunter.logging import configure_logging
@@ -18,7 +18,7 @@ else:
 # Load the driver manager from local cache (if chrome_driver_install.py has been run
 os.environ['WDM_LOCAL'] = '1'
 # Use Google Cloud DB if we run on the cloud
-id_watch = GoogleCloudIdMaintainer(config)
+id_watch = create_storage(config, 'firestore')
 
 configure_logging(config)
 
@@ -27,4 +27,7 @@ config.init_searchers()
 
 hunter = WebHunter(config, id_watch)
 
-hunter.hunt_flats()
+try:
+    hunter.hunt_flats()
+finally:
+    hunter.close()
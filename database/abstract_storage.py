@@ -0,0 +1,81 @@
+"""Abstract class interface for the storage back-ends"""
+import datetime
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class Storage(ABC):
+    """Storage back-end interface, holding processed expose IDs, saved exposes, user
+       settings and the times of previous hunts"""
+
+    @abstractmethod
+    def is_processed(self, expose_id: int, crawler: Optional[str] = None) -> bool:
+        """Returns true if an expose has already been processed. Without a crawler, the
+           ID matches for any crawler"""
+
+    @abstractmethod
+    def mark_processed(self, expose_id: int, crawler: Optional[str] = None):
+        """Mark an expose as processed"""
+
+    @abstractmethod
+    def is_processed_many(self, expose_ids: Iterable[int],
+                          crawler: Optional[str] = None) -> Set[int]:
+        """Returns the subset of the IDs that have already been processed"""
+
+    @abstractmethod
+    def mark_processed_many(self, expose_ids: Iterable[int], crawler: Optional[str] = None):
+        """Mark a list of exposes as processed"""
+
+    @abstractmethod
+    def get_processed_ids(self) -> List[Tuple[int, Optional[str]]]:
+        """Returns (id, crawler) pairs for all processed exposes"""
+
+    @abstractmethod
+    def save_expose(self, expose: Dict):
+        """Saves an expose"""
+
+    @abstractmethod
+    def save_exposes(self, exposes: Iterable[Dict]):
+        """Saves a list of exposes"""
+
+    @abstractmethod
+    def get_exposes_since(self, min_datetime: datetime.datetime,
+                          fields: Optional[List[str]] = None) -> List[Dict]:
+        """Returns all exposes saved since the datetime, newest first. If a list of fields
+           is given, only those fields and 'created_at' need to be returned"""
+
+    def get_recent_exposes(self, count: int, filter_set=None) -> List[Dict]:
+        """Returns up to 'count' recent exposes, filtered by the provided filter"""
+        return self.get_recent_exposes_page(count, filter_set)[0]
+
+    @abstractmethod
+    def get_recent_exposes_page(self, count: int, filter_set=None,
+                                cursor: Optional[str] = None) -> Tuple[List[Dict],
+                                                                       Optional[str]]:
+        """Returns up to 'count' recent exposes older than the cursor, filtered by the
+           provided filter, and the cursor for the following page (None on the last page)"""
+
+    @abstractmethod
+    def save_settings_for_user(self, user_id: int, settings: Dict):
+        """Saves the settings of a user"""
+
+    @abstractmethod
+    def get_settings_for_user(self, user_id: int) -> Optional[Dict]:
+        """Loads the settings of a user, or None if there are none"""
+
+    @abstractmethod
+    def get_user_settings(self) -> List[Tuple[int, Dict]]:
+        """Loads the settings of all users, as (user_id, settings) pairs"""
+
+    @abstractmethod
+    def get_last_run_time(self) -> Optional[datetime.datetime]:
+        """Returns the time of the last hunt"""
+
+    @abstractmethod
+    def update_last_run_time(self) -> datetime.datetime:
+        """Saves the time of the most recent hunt, and returns it"""
+
+    @abstractmethod
+    def prune(self) -> Dict[str, int]:
+        """Delete data outside the retention policy. Returns the number of exposes,
+           processed IDs and executions deleted"""
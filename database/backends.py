@@ -0,0 +1,24 @@
+"""Selection of the storage back-end from the configuration"""
+from database.abstract_storage import Storage
+from database.idmaintainer import IdMaintainer
+from database.memory_storage import MemoryStorage
+from flathunter.exceptions import ConfigException
+
+BACKENDS = ('sqlite', 'memory', 'firestore')
+
+
+def create_storage(config, default_backend='sqlite') -> Storage:
+    """Create the storage back-end named by the 'storage_backend' setting, or the default
+       back-end of the entry point if none is configured"""
+    backend = str(config.storage_backend() or default_backend).lower()
+    if backend == 'sqlite':
+        return IdMaintainer(f'{config.database_location()}/processed_ids.db', config)
+    if backend == 'memory':
+        return MemoryStorage(config)
+    if backend == 'firestore':
+        # Imported here, so that the Firebase libraries are only loaded when used
+        # pylint: disable=import-outside-toplevel
+        from database.googlecloud_idmaintainer import GoogleCloudIdMaintainer
+        return GoogleCloudIdMaintainer(config)
+    raise ConfigException(f"Invalid storage backend: {backend}. "
+                          f"Supported backends are {', '.join(BACKENDS)}")
@@ -0,0 +1,59 @@
+"""Write-behind buffer for saving exposes to the storage back-ends"""
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+
+class BufferedExposeWriter:
+    """Collects exposes to be saved, and writes them to storage with a single 'save_exposes'
+       call once 'batch_size' exposes are buffered or the oldest buffered expose is more
+       than 'flush_interval' seconds old. Buffered exposes are only written on calls to
+       'save' and 'flush', so 'flush' has to be called once no more exposes follow"""
+
+    def __init__(self, id_watch, batch_size: int, flush_interval: Optional[float]):
+        self.id_watch = id_watch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.buffer: List[Dict] = []
+        self.buffered_since: Optional[float] = None
+
+    def save(self, expose: Dict):
+        """Buffer an expose for saving"""
+        self.save_many([expose])
+
+    def save_many(self, exposes: Iterable[Dict]):
+        """Buffer a list of exposes for saving, and write the buffer if it is due"""
+        with self.lock:
+            if self.buffered_since is None:
+                self.buffered_since = time.monotonic()
+            self.buffer.extend(exposes)
+            if not self.is_due():
+                return
+            batch = self.take_buffer()
+        self.write(batch)
+
+    def is_due(self) -> bool:
+        """True if the buffer should be written. Caller holds the lock"""
+        if len(self.buffer) >= self.batch_size:
+            return True
+        return self.flush_interval is not None and self.buffered_since is not None \
+            and time.monotonic() - self.buffered_since >= self.flush_interval
+
+    def take_buffer(self) -> List[Dict]:
+        """Empty the buffer, returning its contents. Caller holds the lock"""
+        batch = self.buffer
+        self.buffer = []
+        self.buffered_since = None
+        return batch
+
+    def write(self, batch: List[Dict]):
+        """Save a batch of exposes"""
+        if batch:
+            self.id_watch.save_exposes(batch)
+
+    def flush(self):
+        """Write all buffered exposes"""
+        with self.lock:
+            batch = self.take_buffer()
+        self.write(batch)
@@ -0,0 +1,75 @@
+"""Serialisation of the exposes stored in the SQLite database.
+
+Exposes were originally stored as JSON text. Encoded exposes are stored as a BLOB that
+starts with a version byte naming the format of the rest of the value. A JSON document
+never starts with one of these bytes, so rows written in any format can be read back."""
+import json
+import zlib
+from typing import Callable, Dict, Mapping, Union, cast
+
+from flathunter.exceptions import ConfigException
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Version bytes of the encoded formats
+ZLIB_JSON = 1
+MSGPACK = 2
+
+ZLIB_LEVEL = 6
+
+
+# Exposes may be Expose records rather than dictionaries; the encoders convert them
+# with 'default=dict'
+def encode_json(expose: Mapping) -> str:
+    """Encode an expose as JSON text, as stored before codecs were added"""
+    return json.dumps(expose, default=dict)
+
+
+def encode_zlib(expose: Mapping) -> bytes:
+    """Encode an expose as compressed JSON"""
+    data = json.dumps(expose, separators=(',', ':'), default=dict).encode('utf-8')
+    return bytes([ZLIB_JSON]) + zlib.compress(data, ZLIB_LEVEL)
+
+
+def encode_msgpack(expose: Mapping) -> bytes:
+    """Encode an expose with msgpack"""
+    if msgpack is None:
+        raise ConfigException("The msgpack expose codec requires the 'msgpack' package")
+    # the type stubs allow None, which packb never returns
+    data = cast(bytes, msgpack.packb(expose, use_bin_type=True, default=dict))
+    return bytes([MSGPACK]) + data
+
+
+ENCODERS: Dict[str, Callable[[Mapping], Union[str, bytes]]] = {
+    'json': encode_json,
+    'zlib': encode_zlib,
+    'msgpack': encode_msgpack,
+}
+
+
+def get_encoder(codec: str) -> Callable[[Mapping], Union[str, bytes]]:
+    """The encoder for the named codec"""
+    codec = str(codec).lower()
+    if codec not in ENCODERS:
+        raise ConfigException(f"Invalid expose codec: {codec}. "
+                              f"Supported codecs are {', '.join(ENCODERS)}")
+    if codec == 'msgpack' and msgpack is None:
+        raise ConfigException("The msgpack expose codec requires the 'msgpack' package")
+    return ENCODERS[codec]
+
+
+def decode_expose(data: Union[str, bytes]) -> Dict:
+    """Decode a stored expose, whichever codec it was written with"""
+    if isinstance(data, str):
+        return json.loads(data)
+    if data[0] == ZLIB_JSON:
+        return json.loads(zlib.decompress(data[1:]))
+    if data[0] == MSGPACK:
+        if msgpack is None:
+            raise ConfigException("Reading msgpack-encoded exposes requires the "
+                                  "'msgpack' package")
+        return msgpack.unpackb(data[1:], raw=False)
+    return json.loads(data)
@@ -1,71 +1,217 @@
 """Storage back-end implementation using Google Cloud Firestore"""
 import datetime
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 import pytz
 import firebase_admin
 from firebase_admin import credentials
 from firebase_admin import firestore
+from google.cloud.firestore import Client
 from google.cloud.firestore_v1.base_query import BaseQuery
 
 from flathunter.logging import logger
 from flathunter.exceptions import PersistenceException
+from database.abstract_storage import Storage
+from database.seen_cache import SeenIdCache
 
 
-class GoogleCloudIdMaintainer:
-    """Storage back-end - implementation of IdMaintainer API"""
+class GoogleCloudIdMaintainer(Storage):
+    """Storage back-end using Google Cloud Firestore"""
+
+    # Project ID used with the Firestore emulator if none is configured
+    EMULATOR_PROJECT_ID = 'flathunter-local'
 
     def __init__(self, config):
         project_id = config.google_cloud_project_id()
-        if project_id is None:
-            raise PersistenceException(
-                "Need to project a google_cloud_project_id in config.yaml")
-        firebase_admin.initialize_app(credentials.ApplicationDefault(), {
-            'projectId': project_id
-        })
-        self.database = firestore.client()
-
-    def mark_processed(self, expose_id):
-        """Mark exposes as processed when we have processed them"""
+        emulator_host = config.firestore_emulator_host()
+        if emulator_host is not None:
+            # The Firestore client connects to the emulator named in this variable,
+            # without credentials
+            os.environ['FIRESTORE_EMULATOR_HOST'] = emulator_host
+            self.database = Client(project=project_id or self.EMULATOR_PROJECT_ID)
+        else:
+            if project_id is None:
+                raise PersistenceException(
+                    "Need to project a google_cloud_project_id in config.yaml")
+            firebase_admin.initialize_app(credentials.ApplicationDefault(), {
+                'projectId': project_id
+            })
+            self.database = firestore.client()
+        # Reading the whole 'processed' collection would cost a document read per ID on
+        # every cold start, so the cache only remembers the IDs seen by this process
+        self.seen_cache = SeenIdCache(None)
+
+    # pylint: disable=unused-argument
+    def mark_processed(self, expose_id, crawler=None):
+        """Mark exposes as processed when we have processed them. Documents are keyed
+           by expose ID only, so the crawler is ignored"""
         logger.debug('mark_processed(%d)', expose_id)
         self.database.collection('processed').document(
             str(expose_id)).set({'id': expose_id})
+        self.seen_cache.add(expose_id)
 
-    def is_processed(self, expose_id):
+    # pylint: disable=unused-argument
+    def is_processed(self, expose_id, crawler=None):
         """Returns true if an expose has already been marked as processed"""
         logger.debug('is_processed(%d)', expose_id)
+        if self.seen_cache.contains(expose_id):
+            return True
         doc = self.database.collection('processed').document(str(expose_id))
-        return doc.get().exists
+        if doc.get().exists:
+            self.seen_cache.add(expose_id)
+            return True
+        return False
 
-    def save_expose(self, expose):
-        """Writes an expose to the storage backend"""
-        record = expose.copy()
+    def get_processed_ids(self) -> List[Tuple[int, Optional[str]]]:
+        """Returns (id, crawler) pairs for all processed exposes. The crawler is not
+           stored in Firestore, so it is always None"""
+        return [(int(doc.id), None) for doc in self.database.collection('processed').stream()]
+
+    # Maximum number of writes in a Firestore batch
+    MAX_BATCH_WRITES = 500
+
+    # Documents fetched per 'get_all' request, and number of requests run in parallel
+    MAX_GET_ALL_REFS = 100
+    READ_WORKERS = 4
+
+    def get_existing_ids(self, collection_name, expose_ids):
+        """Returns the subset of the IDs that have a document in the collection. The
+           documents are fetched in chunks, with the chunks requested in parallel"""
+        collection = self.database.collection(collection_name)
+        references = [collection.document(str(expose_id)) for expose_id in expose_ids]
+        chunks = [references[start:start + self.MAX_GET_ALL_REFS]
+                  for start in range(0, len(references), self.MAX_GET_ALL_REFS)]
+
+        def fetch(chunk):
+            return {int(doc.id) for doc in self.database.get_all(chunk) if doc.exists}
+
+        if len(chunks) <= 1:
+            return set().union(*map(fetch, chunks))
+        with ThreadPoolExecutor(max_workers=min(self.READ_WORKERS, len(chunks)),
+                                thread_name_prefix='firestore') as executor:
+            return set().union(*executor.map(fetch, chunks))
+
+    # pylint: disable=unused-argument
+    def is_processed_many(self, expose_ids, crawler=None):
+        """Returns the subset of the IDs that have already been marked as processed.
+           IDs missing from the in-memory cache are fetched with batched reads"""
+        processed = set()
+        unknown_ids = set()
+        for expose_id in expose_ids:
+            if self.seen_cache.contains(expose_id):
+                processed.add(expose_id)
+            else:
+                unknown_ids.add(expose_id)
+        if not unknown_ids:
+            return processed
+        found = self.get_existing_ids('processed', unknown_ids)
+        self.seen_cache.add_many(found)
+        return processed.union(found)
+
+    # pylint: disable=unused-argument
+    def mark_processed_many(self, expose_ids, crawler=None):
+        """Mark a list of exposes as processed, using batched writes"""
+        expose_ids = list(expose_ids)
+        collection = self.database.collection('processed')
+        for start in range(0, len(expose_ids), self.MAX_BATCH_WRITES):
+            batch = self.database.batch()
+            for expose_id in expose_ids[start:start + self.MAX_BATCH_WRITES]:
+                batch.set(collection.document(str(expose_id)), {'id': expose_id})
+            batch.commit()
+        self.seen_cache.add_many(expose_ids)
+
+    @staticmethod
+    def expose_record(expose):
+        """Build the document stored for an expose"""
+        record = dict(expose)
         record.update({'created_at': pytz.utc.localize(datetime.datetime.now()),
                        'created_sort': (0 - datetime.datetime.now().timestamp())})
+        return record
+
+    def save_expose(self, expose):
+        """Writes an expose to the storage backend"""
         self.database.collection('exposes').document(
-            str(expose['id'])).set(record)
+            str(expose['id'])).set(self.expose_record(expose))
+
+    def save_exposes(self, exposes):
+        """Writes a list of exposes to the storage backend, using batched writes"""
+        exposes = list(exposes)
+        collection = self.database.collection('exposes')
+        for start in range(0, len(exposes), self.MAX_BATCH_WRITES):
+            batch = self.database.batch()
+            for expose in exposes[start:start + self.MAX_BATCH_WRITES]:
+                batch.set(collection.document(str(expose['id'])), self.expose_record(expose))
+            batch.commit()
+
+    # Number of documents fetched per request when streaming query results
+    QUERY_PAGE_SIZE = 500
 
-    def get_exposes_since(self, min_datetime):
-        """Returns all exposes since the supplied datetime"""
+    @staticmethod
+    def stream_pages(make_query, page_size):
+        """Stream the documents of a query, fetching 'page_size' documents per request and
+           continuing each request after the last document of the previous one. The query
+           is rebuilt for each request by calling 'make_query'"""
+        last_doc = None
+        while True:
+            query = make_query()
+            if last_doc is not None:
+                query = query.start_after(last_doc)
+            docs = list(query.limit(page_size).stream())
+            yield from docs
+            if len(docs) < page_size:
+                return
+            last_doc = docs[-1]
+
+    def get_exposes_since(self, min_datetime, fields=None):
+        """Returns all exposes since the supplied datetime, newest first. If a list of
+           fields is given, only those fields and 'created_at' are read"""
         localized_datetime = min_datetime.replace(tzinfo=pytz.UTC)
-        res = []
-        for doc in self.database.collection('exposes') \
-                .order_by('created_sort').limit(10000).stream():
-            if doc.to_dict()['created_at'] < localized_datetime:
-                break
-            res.append(doc.to_dict())
-        return res
 
-    def get_recent_exposes(self, count, filter_set=None):
-        """Returns recent exposes (no more than 'count'), conforming to
-           the provided filter if supplied"""
+        def make_query():
+            query = self.database.collection('exposes') \
+                .where('created_at', '>=', localized_datetime) \
+                .order_by('created_at', direction=BaseQuery.DESCENDING)
+            if fields is not None:
+                query = query.select(list(set(fields) | {'created_at'}))
+            return query
+        return [doc.to_dict() for doc in self.stream_pages(make_query, self.QUERY_PAGE_SIZE)]
+
+    # Maximum number of documents read for one page of recent exposes
+    MAX_PAGE_SCAN = 100
+
+    def get_recent_exposes_page(self, count, filter_set=None, cursor=None):
+        """Returns recent exposes (no more than 'count') older than the cursor, conforming
+           to the provided filter if supplied, and the cursor for the following page.
+           Documents are read in small pages until enough exposes match the filter, or
+           MAX_PAGE_SCAN documents have been read"""
+        start = None
+        if cursor is not None:
+            try:
+                start = {'created_sort': float(cursor)}
+            except ValueError:
+                logger.warning("Invalid page cursor: %s", cursor)
+
+        def make_query():
+            query = self.database.collection('exposes').order_by('created_sort')
+            if start is not None:
+                query = query.start_after(start)
+            return query
+
         res = []
-        for doc in self.database.collection('exposes') \
-                .order_by('created_sort').limit(100).stream():
+        scanned = 0
+        last_sort_key = None
+        for doc in self.stream_pages(make_query, min(max(count * 2, 20), self.MAX_PAGE_SCAN)):
             expose = doc.to_dict()
+            scanned += 1
+            last_sort_key = expose['created_sort']
             if filter_set is None or filter_set.is_interesting_expose(expose):
                 res.append(expose)
                 if len(res) == count:
-                    break
-        return res
+                    return res, str(last_sort_key)
+            if scanned == self.MAX_PAGE_SCAN:
+                return res, str(last_sort_key)
+        return res, None
 
     def get_settings_for_user(self, user_id):
         """Loads the user settings from the database"""
@@ -98,3 +244,8 @@ class GoogleCloudIdMaintainer:
         time = datetime.datetime.now()
         self.database.collection('executions').add({'timestamp': time})
         return time
+
+    def prune(self):
+        """Old documents are not deleted by flathunter. Configure TTL policies on the
+           Firestore collections to expire them"""
+        return {'exposes': 0, 'processed': 0, 'executions': 0}
@@ -1,11 +1,19 @@
 """SQLite implementation of IDMaintainer interface"""
 import threading
 import sqlite3 as lite
+import base64
 import datetime
 import json
 
+from flathunter.config import YamlConfig
+from flathunter.exceptions import ConfigException
 from flathunter.logging import logger
 from flathunter.abstract_processor import Processor
+from database.abstract_storage import Storage
+from database.buffered_writer import BufferedExposeWriter
+from database.expose_codec import decode_expose, get_encoder
+from database.seen_cache import SeenIdCache
+from database.sql_filter import compile_filter, expose_columns
 
 __author__ = "Nody"
 __version__ = "0.1"
@@ -14,72 +22,274 @@ __email__ = "harrymcfly@protonmail.com"
 __status__ = "Prodction"
 
 class SaveAllExposesProcessor(Processor):
-    """Processor that saves all exposes to the database"""
+    """Processor that saves all exposes to the database. Saves are buffered and written
+       in batches; the buffer is flushed when the sequence of exposes ends"""
 
     def __init__(self, config, id_watch):
         self.config = config
         self.id_watch = id_watch
+        self.writer = BufferedExposeWriter(id_watch, config.save_batch_size(),
+                                           config.save_flush_interval())
 
     def process_expose(self, expose):
         """Save a single expose"""
-        self.id_watch.save_expose(expose)
+        self.writer.save(expose)
         return expose
 
-class IdMaintainer:
+    def process_batch(self, exposes):
+        """Save a batch of exposes at once"""
+        self.writer.save_many(exposes)
+        return exposes
+
+    def process_exposes(self, exposes):
+        """Save every expose in the sequence, and flush the buffer at its end"""
+        try:
+            yield from super().process_exposes(exposes)
+        finally:
+            self.writer.flush()
+
+
+def backfill_expose_columns(connection):
+    """Fill the numeric columns of exposes saved before the columns existed"""
+    rows = connection.execute('SELECT id, crawler, details FROM exposes').fetchall()
+    connection.executemany('UPDATE exposes SET price = ?, size = ?, rooms = ?, pps = ? \
+                            WHERE id = ? AND crawler = ?',
+                           [expose_columns(decode_expose(details)) + (expose_id, crawler)
+                            for (expose_id, crawler, details) in rows])
+
+
+def backfill_processed_time(connection):
+    """Record IDs processed before processing times were stored as processed now"""
+    connection.execute('UPDATE processed SET marked = ? WHERE marked IS NULL',
+                       (datetime.datetime.now(),))
+
+
+# Schema migrations, applied in order. A database that has seen the first N migrations
+# stores N in its 'user_version' pragma
+MIGRATIONS = [
+    (
+        'CREATE TABLE IF NOT EXISTS processed (ID INTEGER)',
+        'CREATE TABLE IF NOT EXISTS executions (timestamp timestamp)',
+        'CREATE TABLE IF NOT EXISTS exposes (id INTEGER, created TIMESTAMP, \
+                crawler STRING, details BLOB, PRIMARY KEY (id, crawler))',
+        'CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, settings BLOB)',
+    ),
+    # Key processed IDs by crawler. IDs processed before are kept with an empty crawler
+    (
+        "CREATE TABLE processed_by_crawler (id INTEGER NOT NULL, \
+                crawler TEXT NOT NULL DEFAULT '', PRIMARY KEY (id, crawler)) WITHOUT ROWID",
+        "INSERT OR IGNORE INTO processed_by_crawler (id, crawler) \
+                SELECT ID, '' FROM processed WHERE ID IS NOT NULL",
+        'DROP TABLE processed',
+        'ALTER TABLE processed_by_crawler RENAME TO processed',
+    ),
+    # Index exposes by creation time, for listing the most recent exposes
+    (
+        'CREATE INDEX IF NOT EXISTS exposes_created ON exposes (created, id, crawler)',
+    ),
+    # Store the numeric fields of exposes in their own columns, so that filters run in SQL
+    (
+        'ALTER TABLE exposes ADD COLUMN price REAL',
+        'ALTER TABLE exposes ADD COLUMN size REAL',
+        'ALTER TABLE exposes ADD COLUMN rooms REAL',
+        'ALTER TABLE exposes ADD COLUMN pps REAL',
+        backfill_expose_columns,
+        'CREATE INDEX IF NOT EXISTS exposes_price ON exposes (price)',
+        'CREATE INDEX IF NOT EXISTS exposes_size ON exposes (size)',
+        'CREATE INDEX IF NOT EXISTS exposes_rooms ON exposes (rooms)',
+        'CREATE INDEX IF NOT EXISTS exposes_pps ON exposes (pps)',
+        'CREATE INDEX IF NOT EXISTS exposes_crawler ON exposes (crawler)',
+    ),
+    # Record when IDs were processed, and index the time columns used by the retention
+    # policy and by the last run time
+    (
+        'ALTER TABLE processed ADD COLUMN marked TIMESTAMP',
+        backfill_processed_time,
+        'CREATE INDEX IF NOT EXISTS processed_marked ON processed (marked)',
+        'CREATE INDEX IF NOT EXISTS executions_timestamp ON executions (timestamp)',
+    ),
+]
+
+
+JOURNAL_MODES = ('delete', 'truncate', 'persist', 'memory', 'wal', 'off')
+SYNCHRONOUS_MODES = ('off', 'normal', 'full', 'extra')
+
+
+def connect(db_name, config):
+    """Open a connection to the SQLite database, with the journal mode, sync level,
+       memory map, page cache and statement cache set from the config"""
+    journal_mode = str(config.sqlite_journal_mode()).lower()
+    if journal_mode not in JOURNAL_MODES:
+        raise ConfigException(f"Invalid sqlite journal_mode: {journal_mode}")
+    synchronous = str(config.sqlite_synchronous()).lower()
+    if synchronous not in SYNCHRONOUS_MODES:
+        raise ConfigException(f"Invalid sqlite synchronous setting: {synchronous}")
+    connection = lite.connect(db_name, timeout=float(config.sqlite_busy_timeout()),
+                              cached_statements=int(config.sqlite_cached_statements()))
+    connection.execute(f'PRAGMA journal_mode = {journal_mode}')
+    connection.execute(f'PRAGMA synchronous = {synchronous}')
+    connection.execute(f'PRAGMA mmap_size = {int(config.sqlite_mmap_size())}')
+    connection.execute(f'PRAGMA cache_size = {-int(config.sqlite_cache_size())}')
+    return connection
+
+
+def migrate(connection):
+    """Bring the database schema up to date. The migrations run in a single write
+       transaction, so that connections opened in parallel apply them only once. Each
+       migration is a list of SQL statements, or functions taking the connection"""
+    if connection.execute('PRAGMA user_version').fetchone()[0] >= len(MIGRATIONS):
+        return
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        version = connection.execute('PRAGMA user_version').fetchone()[0]
+        for statements in MIGRATIONS[version:]:
+            for statement in statements:
+                if callable(statement):
+                    statement(connection)
+                else:
+                    connection.execute(statement)
+        if version < len(MIGRATIONS):
+            logger.debug('Migrated database from version %d to %d', version, len(MIGRATIONS))
+            connection.execute(f'PRAGMA user_version = {len(MIGRATIONS)}')
+        connection.commit()
+    except lite.Error:
+        connection.rollback()
+        raise
+
+
+def encode_cursor(key):
+    """Encode the (created, id, crawler) key of an expose as an opaque page cursor"""
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Decode a page cursor. Returns None for a missing or invalid cursor"""
+    if not cursor:
+        return None
+    try:
+        (created, expose_id, crawler) = json.loads(base64.urlsafe_b64decode(cursor))
+    except (ValueError, TypeError):
+        logger.warning("Invalid page cursor: %s", cursor)
+        return None
+    return (created, expose_id, crawler)
+
+
+class IdMaintainer(Storage):
     """SQLite back-end for the database"""
 
-    def __init__(self, db_name):
+    def __init__(self, db_name, config=None):
         self.db_name = db_name
+        self.config = config if config is not None else YamlConfig()
         self.threadlocal = threading.local()
+        self.encode_expose = get_encoder(self.config.sqlite_expose_codec())
+        self.seen_cache = SeenIdCache(self.get_processed_ids)
 
     def get_connection(self):
         """Connects to the SQLite database. Connections are thread-local"""
         connection = getattr(self.threadlocal, 'connection', None)
         if connection is None:
             try:
-                self.threadlocal.connection = lite.connect(self.db_name)
-                connection = self.threadlocal.connection
-                cur = self.threadlocal.connection.cursor()
-                cur.execute('CREATE TABLE IF NOT EXISTS processed (ID INTEGER)')
-                cur.execute('CREATE TABLE IF NOT EXISTS executions (timestamp timestamp)')
-                cur.execute('CREATE TABLE IF NOT EXISTS exposes (id INTEGER, created TIMESTAMP, \
-                                    crawler STRING, details BLOB, PRIMARY KEY (id, crawler))')
-                cur.execute('CREATE TABLE IF NOT EXISTS users \
-                                    (id INTEGER PRIMARY KEY, settings BLOB)')
-                self.threadlocal.connection.commit()
+                connection = connect(self.db_name, self.config)
+                migrate(connection)
+                self.threadlocal.connection = connection
             except lite.Error as error:
                 logger.error("Error %s:", error.args[0])
                 raise error
         return connection
 
-    def is_processed(self, expose_id):
-        """Returns true if an expose has already been processed"""
+    def is_processed(self, expose_id, crawler=None):
+        """Returns true if an expose has already been processed. Without a crawler, the
+           ID matches for any crawler. IDs stored before processed exposes were keyed by
+           crawler match for every crawler"""
         logger.debug('is_processed(%d)', expose_id)
+        if self.seen_cache.contains(expose_id, crawler):
+            return True
         cur = self.get_connection().cursor()
-        cur.execute('SELECT id FROM processed WHERE id = ?', (expose_id,))
+        if crawler is None:
+            cur.execute('SELECT 1 FROM processed WHERE id = ?', (expose_id,))
+        else:
+            cur.execute("SELECT 1 FROM processed WHERE id = ? AND crawler IN (?, '')",
+                        (expose_id, crawler))
         row = cur.fetchone()
         return row is not None
 
-    def mark_processed(self, expose_id):
+    def mark_processed(self, expose_id, crawler=None):
         """Mark an expose as processed in the database"""
         logger.debug('mark_processed(%d)', expose_id)
         cur = self.get_connection().cursor()
-        cur.execute('INSERT INTO processed VALUES(?)', (expose_id,))
+        cur.execute('INSERT OR IGNORE INTO processed (id, crawler, marked) VALUES (?, ?, ?)',
+                    (expose_id, crawler or '', datetime.datetime.now()))
         self.get_connection().commit()
+        self.seen_cache.add(expose_id, crawler)
+
+    def get_processed_ids(self):
+        """Returns (id, crawler) pairs for all processed exposes"""
+        cur = self.get_connection().cursor()
+        cur.execute('SELECT id, crawler FROM processed')
+        return cur.fetchall()
+
+    # Maximum number of IDs bound to a single query
+    MAX_QUERY_IDS = 500
+
+    def is_processed_many(self, expose_ids, crawler=None):
+        """Returns the subset of the IDs that have already been processed. Only IDs
+           that are not in the in-memory cache are looked up in the database"""
+        processed = set()
+        unknown_ids = []
+        for expose_id in expose_ids:
+            if self.seen_cache.contains(expose_id, crawler):
+                processed.add(expose_id)
+            else:
+                unknown_ids.append(expose_id)
+        expose_ids = unknown_ids
+        cur = self.get_connection().cursor()
+        for start in range(0, len(expose_ids), self.MAX_QUERY_IDS):
+            chunk = expose_ids[start:start + self.MAX_QUERY_IDS]
+            placeholders = ', '.join('?' * len(chunk))
+            if crawler is None:
+                cur.execute(f'SELECT id FROM processed WHERE id IN ({placeholders})', chunk)
+            else:
+                cur.execute(f"SELECT id FROM processed WHERE id IN ({placeholders}) \
+                              AND crawler IN (?, '')", chunk + [crawler])
+            processed.update(row[0] for row in cur.fetchall())
+        return processed
+
+    def mark_processed_many(self, expose_ids, crawler=None):
+        """Mark a list of exposes as processed in a single transaction"""
+        expose_ids = list(expose_ids)
+        cur = self.get_connection().cursor()
+        now = datetime.datetime.now()
+        cur.executemany('INSERT OR IGNORE INTO processed (id, crawler, marked) VALUES (?, ?, ?)',
+                        [(expose_id, crawler or '', now) for expose_id in expose_ids])
+        self.get_connection().commit()
+        self.seen_cache.add_many(expose_ids, crawler)
 
     def save_expose(self, expose):
         """Saves an expose to a database"""
         cur = self.get_connection().cursor()
-        cur.execute('INSERT OR REPLACE INTO exposes(id, created, crawler, details) \
-                     VALUES (?, ?, ?, ?)',
+        cur.execute('INSERT OR REPLACE INTO exposes(id, created, crawler, details, \
+                     price, size, rooms, pps) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
                     (int(expose['id']), datetime.datetime.now(),
-                     expose['crawler'], json.dumps(expose)))
+                     expose['crawler'], self.encode_expose(expose)) + expose_columns(expose))
         self.get_connection().commit()
 
-    def get_exposes_since(self, min_datetime):
-        """Loads all exposes since the specified date"""
+    def save_exposes(self, exposes):
+        """Saves a list of exposes to the database in a single transaction"""
+        now = datetime.datetime.now()
+        cur = self.get_connection().cursor()
+        cur.executemany('INSERT OR REPLACE INTO exposes(id, created, crawler, details, \
+                         price, size, rooms, pps) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                        [(int(expose['id']), now, expose['crawler'], self.encode_expose(expose))
+                         + expose_columns(expose) for expose in exposes])
+        self.get_connection().commit()
+
+    def get_exposes_since(self, min_datetime, fields=None):
+        """Loads all exposes since the specified date, newest first. If a list of fields
+           is given, the exposes only hold those fields and 'created_at'"""
         def row_to_expose(row):
-            obj = json.loads(row[2])
+            obj = decode_expose(row[2])
+            if fields is not None:
+                obj = {field: obj[field] for field in fields if field in obj}
             obj['created_at'] = row[0]
             return obj
         cur = self.get_connection().cursor()
@@ -87,21 +297,44 @@ class IdMaintainer:
                      WHERE created >= ? ORDER BY created DESC', (min_datetime,))
         return list(map(row_to_expose, cur.fetchall()))
 
-    def get_recent_exposes(self, count, filter_set=None):
-        """Returns up to 'count' recent exposes, filtered by the provided filter"""
-        cur = self.get_connection().cursor()
-        cur.execute('SELECT details FROM exposes ORDER BY created DESC')
+    # Maximum number of exposes read from the database for one page of recent exposes
+    MAX_PAGE_SCAN = 1000
+
+    def get_recent_exposes_page(self, count, filter_set=None, cursor=None):
+        """Returns up to 'count' recent exposes older than the cursor, filtered by the
+           provided filter, and the cursor for the following page (None on the last page).
+           Exposes are read along the creation time index. The numeric filters are applied
+           in SQL; at most MAX_PAGE_SCAN of the matching exposes are decoded and checked
+           against the remaining filters, so the page may hold fewer exposes than requested"""
+        (condition, params, residual_filter) = compile_filter(filter_set)
+        key = decode_cursor(cursor)
         res = []
-        next_batch = []
-        while len(res) < count:
-            if len(next_batch) == 0:
-                next_batch = cur.fetchmany()
-                if len(next_batch) == 0:
-                    break
-            expose = json.loads(next_batch.pop()[0])
-            if filter_set is None or filter_set.is_interesting_expose(expose):
-                res.append(expose)
-        return res
+        scanned = 0
+        cur = self.get_connection().cursor()
+        while len(res) < count and scanned < self.MAX_PAGE_SCAN:
+            limit = min(max(count * 2, 20), self.MAX_PAGE_SCAN - scanned)
+            if key is None:
+                cur.execute(f'SELECT created, id, crawler, details FROM exposes \
+                              WHERE {condition} \
+                              ORDER BY created DESC, id DESC, crawler DESC LIMIT ?',
+                            params + [limit])
+            else:
+                cur.execute(f'SELECT created, id, crawler, details FROM exposes \
+                              WHERE {condition} AND (created, id, crawler) < (?, ?, ?) \
+                              ORDER BY created DESC, id DESC, crawler DESC LIMIT ?',
+                            params + list(key) + [limit])
+            rows = cur.fetchall()
+            for row in rows:
+                scanned += 1
+                key = tuple(row[:3])
+                expose = decode_expose(row[3])
+                if residual_filter is None or residual_filter.is_interesting_expose(expose):
+                    res.append(expose)
+                    if len(res) == count:
+                        break
+            if len(rows) < limit and len(res) < count:
+                return res, None
+        return res, encode_cursor(key)
 
     def save_settings_for_user(self, user_id, settings):
         """Saves the user settings to the database"""
@@ -143,3 +376,43 @@ class IdMaintainer:
         cur.execute('INSERT INTO executions VALUES(?);', (result,))
         self.get_connection().commit()
         return result
+
+    def prune(self):
+        """Delete old exposes, processed IDs and executions according to the retention
+           policy. At most 'retention.batch_size' rows are deleted from each table per
+           call, so that pruning a large backlog is spread over several hunts. Returns the
+           number of rows deleted from each table"""
+        batch_size = int(self.config.retention_batch_size())
+        connection = self.get_connection()
+        deleted = {'exposes': 0, 'processed': 0, 'executions': 0}
+
+        def delete(table, condition, params):
+            deleted[table] += connection.execute(
+                f'DELETE FROM {table} WHERE {condition}', params).rowcount
+
+        def cutoff(days):
+            return datetime.datetime.now() - datetime.timedelta(days=float(days))
+
+        max_age = self.config.retention_exposes_max_age_days()
+        if max_age is not None:
+            delete('exposes', 'rowid IN (SELECT rowid FROM exposes WHERE created < ? \
+                   ORDER BY created LIMIT ?)', (cutoff(max_age), batch_size))
+        max_rows = self.config.retention_exposes_max_rows()
+        if max_rows is not None:
+            delete('exposes', 'rowid IN (SELECT rowid FROM exposes \
+                   ORDER BY created DESC LIMIT ? OFFSET ?)', (batch_size, int(max_rows)))
+        max_age = self.config.retention_processed_max_age_days()
+        if max_age is not None:
+            delete('processed', '(id, crawler) IN (SELECT id, crawler FROM processed \
+                   WHERE marked < ? ORDER BY marked LIMIT ?)', (cutoff(max_age), batch_size))
+        max_rows = self.config.retention_executions_max_rows()
+        if max_rows is not None:
+            delete('executions', 'rowid IN (SELECT rowid FROM executions \
+                   ORDER BY timestamp DESC LIMIT ? OFFSET ?)', (batch_size, int(max_rows)))
+        connection.commit()
+        if any(deleted.values()):
+            logger.debug('Pruned database: %s', deleted)
+            # Return free pages to the file system if the database has incremental
+            # auto-vacuum enabled (see 'python -m database.maintenance compact')
+            connection.execute(f'PRAGMA incremental_vacuum({batch_size})').fetchall()
+        return deleted
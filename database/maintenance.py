@@ -0,0 +1,102 @@
+"""Offline maintenance of the SQLite database. Stop flathunter before running these.
+
+Run from the repository root with:
+
+    python -m database.maintenance convert --codec msgpack
+    python -m database.maintenance compact
+"""
+import argparse
+import os
+
+from database.expose_codec import decode_expose, get_encoder
+from database.idmaintainer import IdMaintainer
+from flathunter.config import Config
+from flathunter.logging import logger
+
+DESCRIPTION = 'Offline maintenance of the SQLite database'
+
+# Number of exposes re-encoded per transaction
+CONVERT_CHUNK_SIZE = 1000
+
+
+def convert_exposes(id_watch, codec):
+    """Re-encode all stored exposes with the named codec. Returns the number of exposes
+       converted. Each chunk of rows is converted in its own transaction, so an
+       interrupted conversion leaves a readable database and can be run again"""
+    encode_expose = get_encoder(codec)
+    connection = id_watch.get_connection()
+    converted = 0
+    last_rowid = 0
+    while True:
+        rows = connection.execute('SELECT rowid, details FROM exposes WHERE rowid > ? \
+                                   ORDER BY rowid LIMIT ?',
+                                  (last_rowid, CONVERT_CHUNK_SIZE)).fetchall()
+        if not rows:
+            return converted
+        connection.executemany('UPDATE exposes SET details = ? WHERE rowid = ?',
+                               [(encode_expose(decode_expose(details)), rowid)
+                                for (rowid, details) in rows])
+        connection.commit()
+        converted += len(rows)
+        last_rowid = rows[-1][0]
+        logger.info("Converted %d exposes", converted)
+
+
+def vacuum(id_watch):
+    """Rebuild the database file, returning the space freed by deleted or shrunk rows.
+       Incremental auto-vacuum is enabled on the way, so that the space freed by later
+       pruning is returned after each hunt"""
+    connection = id_watch.get_connection()
+    connection.execute('PRAGMA auto_vacuum = incremental')
+    connection.execute('VACUUM')
+    connection.execute('PRAGMA optimize')
+
+
+def compact(id_watch):
+    """Apply the retention policy to the whole database, then vacuum it. Returns the
+       number of rows deleted from each table"""
+    total = {}
+    while True:
+        deleted = id_watch.prune()
+        for (table, count) in deleted.items():
+            total[table] = total.get(table, 0) + count
+        if not any(deleted.values()):
+            break
+    vacuum(id_watch)
+    return total
+
+
+def main():
+    """Parse the command line and run the maintenance command"""
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument('--config', '-c', default=f'{root_dir}/config.yaml',
+                        help='Config file to use')
+    parser.add_argument('--database', help='Database file. Defaults to the '
+                        'processed_ids.db file in the configured database location')
+    commands = parser.add_subparsers(dest='command', required=True)
+    convert = commands.add_parser('convert', help='Re-encode the stored exposes')
+    convert.add_argument('--codec', help='Codec to convert to. Defaults to the '
+                         'configured sqlite.expose_codec')
+    convert.add_argument('--vacuum', action='store_true',
+                         help='Rebuild the database file after converting')
+    commands.add_parser('compact', help='Delete all rows outside the retention policy, '
+                        'and rebuild the database file')
+    args = parser.parse_args()
+
+    config = Config(args.config)
+    db_name = args.database or f'{config.database_location()}/processed_ids.db'
+    id_watch = IdMaintainer(db_name, config)
+    if args.command == 'convert':
+        codec = args.codec or config.sqlite_expose_codec()
+        count = convert_exposes(id_watch, codec)
+        logger.info("Converted %d exposes in %s to %s", count, db_name, codec)
+        if args.vacuum:
+            vacuum(id_watch)
+    elif args.command == 'compact':
+        deleted = compact(id_watch)
+        logger.info("Deleted %s from %s", deleted, db_name)
+
+
+if __name__ == '__main__':
+    main()
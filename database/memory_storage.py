@@ -0,0 +1,157 @@
+"""In-memory storage back-end, for tests, benchmarks and short-lived runs"""
+import datetime
+import itertools
+import threading
+
+from flathunter.config import YamlConfig
+from flathunter.logging import logger
+from database.abstract_storage import Storage
+
+
+class MemoryStorage(Storage):
+    """Storage back-end keeping everything in memory. Nothing survives the process"""
+
+    def __init__(self, config=None):
+        self.config = config if config is not None else YamlConfig()
+        self.lock = threading.Lock()
+        # expose ID -> {crawler: time processed}. IDs without a crawler use ''
+        self.processed = {}
+        # (expose ID, crawler) -> (sequence number, time saved, expose)
+        self.exposes = {}
+        self.sequence = itertools.count()
+        self.settings = {}
+        self.executions = []
+
+    def is_processed(self, expose_id, crawler=None):
+        """Returns true if an expose has already been processed"""
+        return bool(self.is_processed_many([expose_id], crawler))
+
+    def mark_processed(self, expose_id, crawler=None):
+        """Mark an expose as processed"""
+        self.mark_processed_many([expose_id], crawler)
+
+    def is_processed_many(self, expose_ids, crawler=None):
+        """Returns the subset of the IDs that have already been processed"""
+        with self.lock:
+            return {expose_id for expose_id in expose_ids
+                    if expose_id in self.processed and
+                    (crawler is None or crawler in self.processed[expose_id]
+                     or '' in self.processed[expose_id])}
+
+    def mark_processed_many(self, expose_ids, crawler=None):
+        """Mark a list of exposes as processed"""
+        now = datetime.datetime.now()
+        with self.lock:
+            for expose_id in expose_ids:
+                self.processed.setdefault(expose_id, {}).setdefault(crawler or '', now)
+
+    def get_processed_ids(self):
+        """Returns (id, crawler) pairs for all processed exposes"""
+        with self.lock:
+            return [(expose_id, crawler or None)
+                    for (expose_id, crawlers) in self.processed.items()
+                    for crawler in crawlers]
+
+    def save_expose(self, expose):
+        """Saves an expose"""
+        self.save_exposes([expose])
+
+    def save_exposes(self, exposes):
+        """Saves a list of exposes. Saving an expose again replaces it and makes it the
+           most recent one"""
+        now = datetime.datetime.now()
+        with self.lock:
+            for expose in exposes:
+                key = (int(expose['id']), expose['crawler'])
+                self.exposes.pop(key, None)
+                self.exposes[key] = (next(self.sequence), now, dict(expose))
+
+    def get_exposes_since(self, min_datetime, fields=None):
+        """Returns all exposes saved since the datetime, newest first"""
+        res = []
+        with self.lock:
+            for (_, created, expose) in reversed(list(self.exposes.values())):
+                if created < min_datetime:
+                    break
+                if fields is not None:
+                    expose = {field: expose[field] for field in fields if field in expose}
+                res.append(dict(expose, created_at=created))
+        return res
+
+    def get_recent_exposes_page(self, count, filter_set=None, cursor=None):
+        """Returns up to 'count' recent exposes older than the cursor, filtered by the
+           provided filter, and the cursor for the following page"""
+        try:
+            before = int(cursor) if cursor else None
+        except ValueError:
+            logger.warning("Invalid page cursor: %s", cursor)
+            before = None
+        with self.lock:
+            entries = list(self.exposes.values())
+        res = []
+        for (sequence, _, expose) in reversed(entries):
+            if before is not None and sequence >= before:
+                continue
+            if filter_set is None or filter_set.is_interesting_expose(expose):
+                res.append(expose)
+                if len(res) == count:
+                    return res, str(sequence)
+        return res, None
+
+    def save_settings_for_user(self, user_id, settings):
+        """Saves the settings of a user"""
+        with self.lock:
+            self.settings[user_id] = settings
+
+    def get_settings_for_user(self, user_id):
+        """Loads the settings of a user"""
+        with self.lock:
+            return self.settings.get(user_id)
+
+    def get_user_settings(self):
+        """Loads the settings of all users"""
+        with self.lock:
+            return list(self.settings.items())
+
+    def get_last_run_time(self):
+        """Returns the time of the last hunt"""
+        with self.lock:
+            return self.executions[-1] if self.executions else None
+
+    def update_last_run_time(self):
+        """Saves the time of the most recent hunt"""
+        result = datetime.datetime.now()
+        with self.lock:
+            self.executions.append(result)
+        return result
+
+    def prune(self):
+        """Delete exposes, processed IDs and executions outside the retention policy"""
+        deleted = {'exposes': 0, 'processed': 0, 'executions': 0}
+        now = datetime.datetime.now()
+        with self.lock:
+            max_age = self.config.retention_exposes_max_age_days()
+            max_rows = self.config.retention_exposes_max_rows()
+            entries = list(self.exposes.items())
+            for (index, (key, (_, created, _))) in enumerate(entries):
+                too_old = max_age is not None and \
+                    created < now - datetime.timedelta(days=float(max_age))
+                too_many = max_rows is not None and len(entries) - index > int(max_rows)
+                if too_old or too_many:
+                    del self.exposes[key]
+                    deleted['exposes'] += 1
+            max_age = self.config.retention_processed_max_age_days()
+            if max_age is not None:
+                cutoff = now - datetime.timedelta(days=float(max_age))
+                for (expose_id, crawlers) in list(self.processed.items()):
+                    for (crawler, marked) in list(crawlers.items()):
+                        if marked < cutoff:
+                            del crawlers[crawler]
+                            deleted['processed'] += 1
+                    if not crawlers:
+                        del self.processed[expose_id]
+            max_rows = self.config.retention_executions_max_rows()
+            if max_rows is not None and len(self.executions) > int(max_rows):
+                deleted['executions'] = len(self.executions) - int(max_rows)
+                self.executions = self.executions[-int(max_rows):] if int(max_rows) else []
+        return deleted
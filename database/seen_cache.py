@@ -0,0 +1,79 @@
+"""In-process cache of the IDs of processed exposes, kept in front of the storage back-ends"""
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+
+class SeenIdCache:
+    """Set of processed expose IDs, per crawler. The IDs are kept in compact sorted arrays
+       of 64-bit integers; newly added IDs are collected in a set and merged into the array
+       once enough of them have accumulated. The cache only ever answers 'seen' - an ID
+       that is not in the cache still has to be looked up in storage.
+
+       IDs stored without a crawler match for every crawler, just like in the database"""
+
+    MERGE_THRESHOLD = 1024
+
+    def __init__(self, loader: Optional[Callable[[], Iterable[Tuple[int, Optional[str]]]]]):
+        self.loader = loader
+        self.lock = threading.Lock()
+        self.sorted_ids: Dict[str, array] = {}
+        self.pending_ids: Dict[str, Set[int]] = {}
+        self.is_warm = loader is None
+
+    def warm(self):
+        """Load all processed IDs from storage, the first time the cache is used"""
+        if self.is_warm:
+            return
+        with self.lock:
+            if self.is_warm or self.loader is None:
+                return
+            for (expose_id, crawler) in self.loader():
+                self.pending_ids.setdefault(crawler or '', set()).add(expose_id)
+            for crawler in list(self.pending_ids):
+                self.merge(crawler)
+            self.is_warm = True
+
+    def merge(self, crawler: str):
+        """Merge the pending IDs of a crawler into its sorted array. Caller holds the lock"""
+        pending = self.pending_ids.pop(crawler, set())
+        current = self.sorted_ids.get(crawler, array('q'))
+        self.sorted_ids[crawler] = array('q', sorted(pending.union(current)))
+
+    def contains_in(self, crawler: str, expose_id: int) -> bool:
+        """Check a single crawler's IDs"""
+        if expose_id in self.pending_ids.get(crawler, ()):
+            return True
+        ids = self.sorted_ids.get(crawler)
+        if not ids:
+            return False
+        idx = bisect_left(ids, expose_id)
+        return idx < len(ids) and ids[idx] == expose_id
+
+    def contains(self, expose_id: int, crawler: Optional[str] = None) -> bool:
+        """True if the ID is known to be processed. Without a crawler, the ID matches
+           for any crawler"""
+        self.warm()
+        with self.lock:
+            if crawler is None:
+                crawlers = set(self.sorted_ids).union(self.pending_ids)
+                return any(self.contains_in(name, expose_id) for name in crawlers)
+            return self.contains_in(crawler, expose_id) or self.contains_in('', expose_id)
+
+    def add(self, expose_id: int, crawler: Optional[str] = None):
+        """Record a processed ID"""
+        self.add_many([expose_id], crawler)
+
+    def add_many(self, expose_ids: Iterable[int], crawler: Optional[str] = None):
+        """Record a list of processed IDs"""
+        with self.lock:
+            pending = self.pending_ids.setdefault(crawler or '', set())
+            pending.update(expose_ids)
+            if len(pending) >= self.MERGE_THRESHOLD:
+                self.merge(crawler or '')
+
+    def __len__(self):
+        with self.lock:
+            return sum(len(ids) for ids in self.sorted_ids.values()) + \
+                sum(len(ids) for ids in self.pending_ids.values())
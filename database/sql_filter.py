@@ -0,0 +1,57 @@
+"""Structured expose columns in the SQLite database, and compilation of expose filters into
+   SQL conditions on those columns"""
+from typing import Dict, List, Optional, Tuple
+
+from flathunter.filter import ExposeHelper, Filter, MaxPriceFilter, MinPriceFilter, \
+    MaxSizeFilter, MinSizeFilter, MaxRoomsFilter, MinRoomsFilter, PPSFilter
+
+
+def read_number(getter, expose: Dict) -> Optional[float]:
+    """Apply an ExposeHelper getter, returning None if the field is missing or unparsable"""
+    try:
+        return getter(expose)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def expose_columns(expose: Dict) -> Tuple[Optional[float], ...]:
+    """The (price, size, rooms, pps) columns stored alongside the expose details. Values
+       are parsed in the same way as the filters parse them"""
+    price = read_number(ExposeHelper.get_price, expose)
+    size = read_number(ExposeHelper.get_size, expose)
+    rooms = read_number(ExposeHelper.get_rooms, expose)
+    pps = price / size if price is not None and size else None
+    return (price, size, rooms, pps)
+
+
+# Filters that can be evaluated in SQL, with their column, comparison and threshold.
+# Exposes where the column is NULL pass, just like the filters keep exposes where the
+# value can not be parsed
+SQL_FILTERS = {
+    MaxPriceFilter: ('price', '<=', 'max_price'),
+    MinPriceFilter: ('price', '>=', 'min_price'),
+    MaxSizeFilter: ('size', '<=', 'max_size'),
+    MinSizeFilter: ('size', '>=', 'min_size'),
+    MaxRoomsFilter: ('rooms', '<=', 'max_rooms'),
+    MinRoomsFilter: ('rooms', '>=', 'min_rooms'),
+    PPSFilter: ('pps', '<=', 'max_pps'),
+}
+
+
+def compile_filter(filter_set: Optional[Filter]) -> Tuple[str, List, Optional[Filter]]:
+    """Compile a filter into an SQL condition on the expose columns and its parameters.
+       Filters that can not be expressed in SQL (like the title filter) are returned as a
+       residual filter, to be applied to the decoded exposes, or None if there are none"""
+    if filter_set is None:
+        return ('1', [], None)
+    conditions = []
+    params = []
+    residual = []
+    for expose_filter in filter_set.filters:
+        if type(expose_filter) not in SQL_FILTERS:
+            residual.append(expose_filter)
+            continue
+        (column, operator, attribute) = SQL_FILTERS[type(expose_filter)]
+        conditions.append(f'({column} IS NULL OR {column} {operator} ?)')
+        params.append(getattr(expose_filter, attribute))
+    return (' AND '.join(conditions) or '1', params, Filter(residual) if residual else None)
@@ -9,7 +9,7 @@ from datetime import time as dtime
 
 from flathunter.argument_parser import parse
 from flathunter.logging import logger, configure_logging
-from database.idmaintainer import IdMaintainer
+from database.backends import create_storage
 from flathunter.hunter import Hunter
 from flathunter.config import Config
 from flathunter.heartbeat import Heartbeat
@@ -24,7 +24,7 @@ __status__ = "Production"
 
 def launch_flat_hunt(config, heartbeat: Heartbeat):
     """Starts the crawler / notification loop"""
-    id_watch = IdMaintainer(f'{config.database_location()}/processed_ids.db')
+    id_watch = create_storage(config, 'sqlite')
 
     time_from = dtime.fromisoformat(config.loop_pause_from())
     time_till = dtime.fromisoformat(config.loop_pause_till())
@@ -32,16 +32,19 @@ def launch_flat_hunt(config, heartbeat: Heartbeat):
     wait_during_period(time_from, time_till)
 
     hunter = Hunter(config, id_watch)
-    hunter.hunt_flats()
-    counter = 0
+    try:
+        hunter.hunt_flats()
+        counter = 0
 
-    while config.loop_is_active():
-        wait_during_period(time_from, time_till)
+        while config.loop_is_active():
+            wait_during_period(time_from, time_till)
 
-        counter += 1
-        counter = heartbeat.send_heartbeat(counter)
-        time.sleep(config.loop_period_seconds())
-        hunter.hunt_flats()
+            counter += 1
+            counter = heartbeat.send_heartbeat(counter)
+            time.sleep(config.loop_period_seconds())
+            hunter.hunt_flats()
+    finally:
+        hunter.close()
 
 
 def main():
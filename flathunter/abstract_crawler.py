@@ -1,15 +1,18 @@
 """Interface for webcrawlers. Crawler implementations should subclass this"""
 from abc import ABC
 import re
+import threading
 from time import sleep
-from typing import Optional, Any
+from typing import Optional, Any, Callable, Dict, List, Set, Union
 
 import backoff
 import requests
 # pylint: disable=unused-import
 import requests_random_user_agent
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from selenium.webdriver import Chrome
@@ -21,6 +24,24 @@ from flathunter import proxies
 from flathunter.captcha.captcha_solver import CaptchaUnsolvableError
 from flathunter.logging import logger
 from flathunter.exceptions import ProxyException
+from flathunter.expose import Expose
+from flathunter.parsing import parse_results_page
+
+
+def create_session(pool_size: int, max_retries: int) -> requests.Session:
+    """Create an HTTP session with a keep-alive connection pool of the given size.
+       Failed connections and gateway errors are retried with an exponential backoff"""
+    retry = Retry(total=max_retries,
+                  backoff_factor=0.5,
+                  status_forcelist=(502, 503, 504),
+                  allowed_methods=frozenset(['GET', 'HEAD']),
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
 
 
 class Crawler(ABC):
@@ -28,6 +49,11 @@ class Crawler(ABC):
 
     URL_PATTERN: re.Pattern
 
+    # Restricts the tree built from a results page to the elements read by extract_data.
+    # Strainers match the raw attribute values, so a single class out of a multi-valued
+    # 'class' attribute can not be selected - use tag names, ids or the full attribute value
+    RESULTS_STRAINER: Optional[SoupStrainer] = None
+
     HEADERS = {
         'Connection': 'keep-alive',
         'Pragma': 'no-cache',
@@ -45,37 +71,59 @@ class Crawler(ABC):
 
     def __init__(self, config):
         self.config = config
+        self.session: Optional[requests.Session] = None
+        self.proxy_session: Optional[requests.Session] = None
+        self.session_lock = threading.Lock()
+        # A Selenium driver is not thread-safe, but crawls, expose details and address
+        # lookups of the same crawler run in different threads. Crawlers with a driver
+        # create and use it only while holding this lock
+        self.driver_lock = threading.RLock()
         if config.captcha_enabled():
             self.captcha_solver = config.get_captcha_solver()
 
+    def _get_session(self) -> requests.Session:
+        """Return the pooled HTTP session of this crawler. Connections to the site are
+           kept alive and re-used by all page, expose detail and address requests"""
+        with self.session_lock:
+            if self.session is None:
+                self.session = create_session(self.config.http_pool_size(),
+                                              self.config.http_max_retries())
+            return self.session
+
+    def _get_proxy_session(self) -> requests.Session:
+        """Return the pooled HTTP session used for requests through proxies. Failed
+           requests are not retried, as the proxy loop moves on to the next proxy"""
+        with self.session_lock:
+            if self.proxy_session is None:
+                self.proxy_session = create_session(self.config.http_pool_size(), 0)
+            return self.proxy_session
+
     # pylint: disable=unused-argument
+    def get_page_content(self, search_url, driver=None, page_no=None) -> Union[bytes, str]:
+        """Applies a page number to a formatted search URL and fetches the raw HTML at that page"""
+        return self.get_content_from_url(search_url)
+
     def get_page(self, search_url, driver=None, page_no=None) -> BeautifulSoup:
         """Applies a page number to a formatted search URL and fetches the exposes at that page"""
-        return self.get_soup_from_url(search_url)
+        return BeautifulSoup(self.get_page_content(search_url, driver, page_no), 'lxml')
 
     @backoff.on_exception(wait_gen=backoff.constant,
                           exception=TimeoutException,
                           max_tries=3)
-    def get_soup_from_url(
+    def get_content_from_url(
             self,
             url: str,
             driver: Optional[Any] = None,
             checkbox: bool = False,
-            afterlogin_string: Optional[str] = None) -> BeautifulSoup:
-        """Creates a Soup object from the HTML at the provided URL"""
+            afterlogin_string: Optional[str] = None) -> Union[bytes, str]:
+        """Fetches the raw HTML at the provided URL"""
 
         if self.config.use_proxy():
-            return self.get_soup_with_proxy(url)
+            return self.get_content_with_proxy(url)
         if driver is not None:
-            driver.get(url)
-            if re.search("initGeetest", driver.page_source):
-                self.resolve_geetest(driver)
-            elif re.search("g-recaptcha", driver.page_source):
-                self.resolve_recaptcha(
-                    driver, checkbox, afterlogin_string or "")
-            return BeautifulSoup(driver.page_source, 'lxml')
+            return self._get_content_with_driver(url, driver, checkbox, afterlogin_string)
 
-        resp = requests.get(url, headers=self.HEADERS, timeout=30)
+        resp = self._get_session().get(url, headers=self.HEADERS, timeout=30)
         if resp.status_code not in (200, 405):
             user_agent = 'Unknown'
             if 'User-Agent' in self.HEADERS:
@@ -83,10 +131,32 @@ class Crawler(ABC):
             logger.error("Got response (%i): %s\n%s",
                          resp.status_code, resp.content, user_agent)
 
-        return BeautifulSoup(resp.content, 'lxml')
+        return resp.content
 
-    def get_soup_with_proxy(self, url) -> BeautifulSoup:
-        """Will try proxies until it's possible to crawl and return a soup"""
+    def _get_content_with_driver(self, url: str, driver, checkbox: bool,
+                                 afterlogin_string: Optional[str]) -> str:
+        """Loads the URL in the Selenium driver, solving captchas if required"""
+        with self.driver_lock:
+            driver.get(url)
+            if re.search("initGeetest", driver.page_source):
+                self.resolve_geetest(driver)
+            elif re.search("g-recaptcha", driver.page_source):
+                self.resolve_recaptcha(
+                    driver, checkbox, afterlogin_string or "")
+            return driver.page_source
+
+    def get_soup_from_url(
+            self,
+            url: str,
+            driver: Optional[Any] = None,
+            checkbox: bool = False,
+            afterlogin_string: Optional[str] = None) -> BeautifulSoup:
+        """Creates a Soup object from the HTML at the provided URL"""
+        return BeautifulSoup(
+            self.get_content_from_url(url, driver, checkbox, afterlogin_string), 'lxml')
+
+    def get_content_with_proxy(self, url) -> bytes:
+        """Will try proxies until it's possible to crawl and return the raw HTML"""
         resolved = False
         resp = None
 
@@ -96,7 +166,7 @@ class Crawler(ABC):
             for proxy in proxies_list:
                 try:
                     # Very low proxy read timeout, or it will get stuck on slow proxies
-                    resp = requests.get(
+                    resp = self._get_proxy_session().get(
                         url,
                         headers=self.HEADERS,
                         proxies={"http": proxy, "https": proxy},
@@ -124,31 +194,58 @@ class Crawler(ABC):
             raise ProxyException(
                 "An error occurred while fetching proxies or content")
 
-        return BeautifulSoup(resp.content, 'lxml')
+        return resp.content
+
+    def get_soup_with_proxy(self, url) -> BeautifulSoup:
+        """Will try proxies until it's possible to crawl and return a soup"""
+        return BeautifulSoup(self.get_content_with_proxy(url), 'lxml')
 
     def extract_data(self, soup):
         """Should be implemented in subclass"""
         raise NotImplementedError
 
+    def _extract_data_from_content(self, content: Union[bytes, str]) -> List[Dict]:
+        """Extracts all exposes from the raw HTML of a page. If a parser pool is configured,
+           the page is parsed in one of the worker processes"""
+        parser_pool = self.config.parser_pool()
+        if parser_pool is None:
+            return parse_results_page(type(self), content)
+        return parser_pool.parse(type(self), content)
+
+    @staticmethod
+    def _page_is_known(entries: List[Dict],
+                      seen: Optional[Callable[[List[int]], Set[int]]]) -> bool:
+        """True if crawling incrementally and every expose on the page has been processed.
+           Result pages are sorted newest-first, so the pages after it hold nothing new"""
+        if seen is None or not entries:
+            return False
+        expose_ids = {entry['id'] for entry in entries}
+        return len(seen(list(expose_ids))) == len(expose_ids)
+
     # pylint: disable=unused-argument
-    def get_results(self, search_url, max_pages=None):
-        """Loads the exposes from the site, starting at the provided URL"""
+    def get_results(self, search_url, max_pages=None, seen=None):
+        """Loads the exposes from the site, starting at the provided URL. When crawling
+           incrementally, 'seen' returns which of a list of expose IDs have already been
+           processed; crawlers that page through results stop at the first page that
+           holds only processed exposes"""
         logger.debug("Got search URL %s", search_url)
 
         # load first page
-        soup = self.get_page(search_url)
+        content = self.get_page_content(search_url)
 
         # get data from first page
-        entries = self.extract_data(soup)
+        entries = self._extract_data_from_content(content)
         logger.debug('Number of found entries: %d', len(entries))
 
         return entries
 
-    def crawl(self, url, max_pages=None):
-        """Load as many exposes as possible from the provided URL"""
+    def crawl(self, url, max_pages=None, seen=None):
+        """Load as many exposes as possible from the provided URL. The exposes are
+           returned as Expose records, with their numeric fields parsed"""
         if re.search(self.URL_PATTERN, url):
             try:
-                return self.get_results(url, max_pages)
+                return [Expose.from_dict(expose)
+                        for expose in self.get_results(url, max_pages, seen)]
             except requests.exceptions.ConnectionError:
                 logger.warning(
                     "Connection to %s failed. Retrying.", url.split('/')[2])
@@ -1,14 +1,102 @@
 """Abstract class defining the 'Processor' interface"""
-from typing import Dict
+import queue
+import threading
+import time
+from typing import Dict, Generator, Iterable, Iterator, List, Optional
+
+_END = object()
+
+
+def batched(exposes: Iterable[Dict], batch_size: int,
+            flush_timeout: Optional[float] = None) -> Generator[List[Dict], None, None]:
+    """Group a sequence of exposes into lists of at most 'batch_size' exposes. With a
+       flush timeout, a batch is emitted at the latest 'flush_timeout' seconds after its
+       first expose arrived; the sequence is then read in a background thread, which stops
+       reading when the batches are no longer consumed"""
+    if flush_timeout is None:
+        batch: List[Dict] = []
+        for expose in exposes:
+            batch.append(expose)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        return
+
+    buffer: queue.Queue = queue.Queue()
+    errors = []
+    stop = threading.Event()
+
+    def read():
+        try:
+            for expose in exposes:
+                if stop.is_set():
+                    return
+                buffer.put(expose)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            errors.append(error)
+        buffer.put(_END)
+
+    threading.Thread(target=read, name='processor-batch-reader', daemon=True).start()
+    batch = []
+    deadline = None
+    try:
+        while True:
+            try:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                expose = buffer.get(timeout=timeout)
+            except queue.Empty:
+                yield batch
+                batch, deadline = [], None
+                continue
+            if expose is _END:
+                break
+            batch.append(expose)
+            if deadline is None:
+                deadline = time.monotonic() + flush_timeout
+            if len(batch) >= batch_size:
+                yield batch
+                batch, deadline = [], None
+        if batch:
+            yield batch
+        if errors:
+            raise errors[0]
+    finally:
+        # don't crawl and save exposes that nobody will process
+        stop.set()
+
 
 class Processor:
     """Processor interface. Flathunter runs sequences of exposes through
        a set of processors that stack on each other"""
 
+    batch_size: int = 1
+    flush_timeout: Optional[float] = None
+
     def process_expose(self, expose: Dict) -> Dict:
         """Mutate the expose. Should be implemented in the subclass"""
         return expose
 
-    def process_exposes(self, exposes):
+    def process_batch(self, exposes: List[Dict]) -> List[Dict]:
+        """Mutate a batch of exposes. Subclasses that can amortise work over many
+           exposes override this; by default every expose is processed on its own"""
+        return [self.process_expose(expose) for expose in exposes]
+
+    def supports_batches(self) -> bool:
+        """True if the subclass implements 'process_batch'"""
+        return type(self).process_batch is not Processor.process_batch
+
+    def set_batching(self, batch_size: int, flush_timeout: Optional[float] = None):
+        """Configure the size of the batches passed to 'process_batch', and how long
+           to wait for a batch to fill up before it is processed anyway"""
+        self.batch_size = batch_size
+        self.flush_timeout = flush_timeout
+
+    def process_exposes(self, exposes: Iterable[Dict]) -> Iterator[Dict]:
         """Apply the processor to every expose in the sequence"""
-        return map(self.process_expose, exposes)
+        if self.batch_size <= 1:
+            return map(self.process_expose, exposes)
+        return (expose
+                for batch in batched(exposes, self.batch_size, self.flush_timeout)
+                for expose in self.process_batch(batch))
@@ -1,8 +1,11 @@
 """Wrap configuration options as an object"""
 import os
+import re
+import threading
 from typing import Optional, Dict, Any
 
 import json
+from urllib.parse import urlparse
 import yaml
 from dotenv import load_dotenv
 
@@ -19,6 +22,7 @@ from flathunter.crawler.wggesucht import WgGesucht
 from flathunter.crawler.vrmimmo import VrmImmo
 from flathunter.crawler.subito import Subito
 from flathunter.filter import Filter
+from flathunter.parsing import ParserPool
 from flathunter.logging import logger
 from flathunter.exceptions import ConfigException
 
@@ -43,6 +47,8 @@ class Env:
     FLATHUNTER_DATABASE_LOCATION = _read_env("FLATHUNTER_DATABASE_LOCATION")
     FLATHUNTER_GOOGLE_CLOUD_PROJECT_ID = _read_env(
         "FLATHUNTER_GOOGLE_CLOUD_PROJECT_ID")
+    FLATHUNTER_STORAGE_BACKEND = _read_env("FLATHUNTER_STORAGE_BACKEND")
+    FIRESTORE_EMULATOR_HOST = _read_env("FIRESTORE_EMULATOR_HOST")
     FLATHUNTER_VERBOSE_LOG = _read_env("FLATHUNTER_VERBOSE_LOG")
     FLATHUNTER_LOOP_PERIOD_SECONDS = _read_env(
         "FLATHUNTER_LOOP_PERIOD_SECONDS")
@@ -105,6 +111,9 @@ Preis: {price}
             config = {}
         self.config = config
         self.__searchers__ = []
+        self.__crawler_index__ = {}
+        self.__parser_pool__ = None
+        self.__parser_pool_lock__ = threading.Lock()
         self.check_deprecated()
 
     def __iter__(self):
@@ -117,7 +126,7 @@ Preis: {price}
 
     def init_searchers(self):
         """Initialize search plugins"""
-        self.__searchers__ = [
+        self.set_searchers([
             Immobilienscout(self),
             WgGesucht(self),
             Kleinanzeigen(self),
@@ -127,7 +136,7 @@ Preis: {price}
             Idealista(self),
             MeineStadt(self),
             VrmImmo(self)
-        ]
+        ])
 
     def check_deprecated(self):
         """Notifies user of deprecated config items"""
@@ -165,13 +174,28 @@ Preis: {price}
         return res
 
     def set_searchers(self, searchers):
-        """Update the active search plugins"""
+        """Update the active search plugins, and index them by the hosts of the target URLs"""
         self.__searchers__ = searchers
+        self.__crawler_index__ = {}
+        for url in self.target_urls():
+            self.get_crawler_for_url(url)
 
     def searchers(self):
         """Get the list of search plugins"""
         return self.__searchers__
 
+    def get_crawler_for_url(self, url):
+        """Get the search plugin responsible for the URL, or None if no plugin matches.
+           Plugins are looked up by the scheme and host of the URL, so the URL patterns
+           are only evaluated the first time a host is seen"""
+        parsed_url = urlparse(url)
+        origin = f"{parsed_url.scheme}://{parsed_url.netloc}"
+        if origin not in self.__crawler_index__:
+            self.__crawler_index__[origin] = next(
+                (searcher for searcher in self.__searchers__
+                 if re.search(searcher.URL_PATTERN, url)), None)
+        return self.__crawler_index__[origin]
+
     def get_filter(self):
         """Read the configured filter"""
         builder = Filter.builder()
@@ -221,6 +245,124 @@ Preis: {price}
         """End time of loop pause"""
         return self._read_yaml_path('loop.pause.till', "00:00")
 
+    def crawl_max_workers(self):
+        """Maximum number of URLs that are crawled in parallel"""
+        return self._read_yaml_path('crawl.max_workers', 4)
+
+    def crawl_max_workers_per_host(self):
+        """Maximum number of parallel crawls against the same host"""
+        return self._read_yaml_path('crawl.max_workers_per_host', 1)
+
+    def crawl_incremental(self):
+        """Stop paging through results at the first page without new exposes"""
+        return self._read_yaml_path('crawl.incremental', False)
+
+    def parser_processes(self):
+        """Number of worker processes used to parse result pages (0 to parse in-thread)"""
+        return self._read_yaml_path('parse.processes', 0)
+
+    def parser_pool(self) -> Optional[ParserPool]:
+        """Get the pool of parser processes, or None if pages are parsed in-thread"""
+        if self.parser_processes() <= 0:
+            return None
+        with self.__parser_pool_lock__:
+            if self.__parser_pool__ is None:
+                self.__parser_pool__ = ParserPool(self.parser_processes())
+            return self.__parser_pool__
+
+    def http_pool_size(self):
+        """Number of keep-alive connections each crawler holds open to its website"""
+        return self._read_yaml_path('http.pool_size', 10)
+
+    def http_max_retries(self):
+        """Number of times failed requests to the property portals are retried"""
+        return self._read_yaml_path('http.max_retries', 2)
+
+    def pipeline_enabled(self):
+        """True if the processors should run as a pipeline of threaded stages"""
+        return self._read_yaml_path('pipeline.enabled', False)
+
+    def pipeline_queue_size(self):
+        """Maximum number of exposes waiting between two stages of the pipeline"""
+        return self._read_yaml_path('pipeline.queue_size', 100)
+
+    def pipeline_workers(self, stage):
+        """Number of worker threads for the named stage of the processor pipeline"""
+        return self._read_yaml_path(f'pipeline.workers.{stage}', 1)
+
+    def batch_size(self):
+        """Number of exposes passed at once to processors that work on batches. With a
+           flush timeout, the default batches are smaller, so that exposes pass sooner"""
+        default = 50 if self.batch_flush_timeout() is None else 10
+        return self._read_yaml_path('batch.size', default)
+
+    def batch_flush_timeout(self):
+        """Seconds to wait for a batch of exposes to fill up, or None to wait until
+           the end of the crawl"""
+        return self._read_yaml_path('batch.flush_timeout', None)
+
+    def save_batch_size(self):
+        """Number of exposes buffered before they are written to the database together"""
+        return self._read_yaml_path('save.batch_size', 100)
+
+    def save_flush_interval(self):
+        """Maximum number of seconds an expose is buffered before it is written"""
+        return self._read_yaml_path('save.flush_interval', 10)
+
+    def retention_exposes_max_age_days(self):
+        """Exposes older than this number of days are deleted from the database"""
+        return self._read_yaml_path('retention.exposes_max_age_days', None)
+
+    def retention_exposes_max_rows(self):
+        """Maximum number of exposes kept in the database; older exposes are deleted"""
+        return self._read_yaml_path('retention.exposes_max_rows', None)
+
+    def retention_processed_max_age_days(self):
+        """IDs processed more than this number of days ago are forgotten"""
+        return self._read_yaml_path('retention.processed_max_age_days', None)
+
+    def retention_executions_max_rows(self):
+        """Number of hunt execution times kept in the database"""
+        return self._read_yaml_path('retention.executions_max_rows', 1000)
+
+    def retention_batch_size(self):
+        """Maximum number of rows deleted from each table after a hunt"""
+        return self._read_yaml_path('retention.batch_size', 1000)
+
+    def sqlite_journal_mode(self):
+        """Journal mode of the SQLite database. WAL lets readers and a writer work in parallel"""
+        return self._read_yaml_path('sqlite.journal_mode', 'wal')
+
+    def sqlite_synchronous(self):
+        """How often SQLite syncs the database to disk"""
+        return self._read_yaml_path('sqlite.synchronous', 'normal')
+
+    def sqlite_mmap_size(self):
+        """Number of bytes of the SQLite database that are memory-mapped"""
+        return self._read_yaml_path('sqlite.mmap_size', 256 * 1024 * 1024)
+
+    def sqlite_cache_size(self):
+        """Size of the SQLite page cache of each connection, in KiB"""
+        return self._read_yaml_path('sqlite.cache_size', 16 * 1024)
+
+    def sqlite_cached_statements(self):
+        """Number of prepared statements kept per SQLite connection"""
+        return self._read_yaml_path('sqlite.cached_statements', 256)
+
+    def sqlite_busy_timeout(self):
+        """Seconds to wait for a lock on the SQLite database before giving up"""
+        return self._read_yaml_path('sqlite.busy_timeout', 5)
+
+    def sqlite_expose_codec(self):
+        """Codec used to store exposes in the SQLite database: json, zlib or msgpack"""
+        return self._read_yaml_path('sqlite.expose_codec', 'json')
+
+    def user_matching(self):
+        """How the website matches new exposes to users: 'index' looks up the matching
+           users in an index of their filters, 'matrix' compares all users' filters
+           against all exposes at once"""
+        return self._read_yaml_path('website.user_matching', 'index')
+
     def has_website_config(self):
         """True if the flathunter website configuration is present"""
         return 'website' in self.config
@@ -241,6 +383,15 @@ Preis: {price}
         """Google Cloud project ID for App Engine / Cloud Run deployments"""
         return self._read_yaml_path('google_cloud_project_id', None)
 
+    def storage_backend(self):
+        """Storage back-end to use: sqlite, memory or firestore. None to use the default
+           back-end of the entry point"""
+        return self._read_yaml_path('storage_backend', None)
+
+    def firestore_emulator_host(self):
+        """Host and port of a local Firestore emulator to use instead of Google Cloud"""
+        return self._read_yaml_path('firestore_emulator_host', None)
+
     def message_format(self):
         """Format of the message to send in user notifications"""
         config_format = self._read_yaml_path('message', None)
@@ -479,6 +630,16 @@ class Config(CaptchaEnvironmentConfig):  # pylint: disable=too-many-public-metho
             return Env.FLATHUNTER_GOOGLE_CLOUD_PROJECT_ID
         return super().google_cloud_project_id()
 
+    def storage_backend(self):
+        if Env.FLATHUNTER_STORAGE_BACKEND is not None:
+            return Env.FLATHUNTER_STORAGE_BACKEND
+        return super().storage_backend()
+
+    def firestore_emulator_host(self):
+        if Env.FIRESTORE_EMULATOR_HOST is not None:
+            return Env.FIRESTORE_EMULATOR_HOST
+        return super().firestore_emulator_host()
+
     def message_format(self):
         if Env.FLATHUNTER_MESSAGE_FORMAT is not None:
             return '\n'.join(Env.FLATHUNTER_MESSAGE_FORMAT.split('#CR#'))
@@ -1,6 +1,8 @@
 """Expose crawler for Immobiliare"""
 import re
 
+from bs4 import SoupStrainer
+
 from flathunter.logging import logger
 from flathunter.abstract_crawler import Crawler
 
@@ -9,6 +11,7 @@ class Immobiliare(Crawler):
     """Implementation of Crawler interface for Immobiliare"""
 
     URL_PATTERN = re.compile(r'https://www\.immobiliare\.it')
+    RESULTS_STRAINER = SoupStrainer('ul')
 
     def __init__(self, config):
         super().__init__(config)
@@ -22,9 +25,8 @@ class Immobiliare(Crawler):
         results = soup.find(
             'ul', {"class": "in-realEstateResults"})
 
-        items = results.find_all(lambda l: l.has_attr(
-            'class') and "in-realEstateResults__item" in l['class']
-            and "in-realEstateResults__carouselAgency" not in l["class"])
+        items = results.select(
+            '.in-realEstateResults__item:not(.in-realEstateResults__carouselAgency)')
 
         for row in items:
             title_row = row.find('a', {"class": "in-reListCard__title"})
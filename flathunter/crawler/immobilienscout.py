@@ -1,9 +1,9 @@
 """Expose crawler for ImmobilienScout"""
-from typing import Optional
+from typing import Dict, List, Optional, Tuple, Union
 import datetime
 import re
 
-from bs4 import BeautifulSoup, Tag
+from bs4 import SoupStrainer
 from jsonpath_ng.ext import parse
 from selenium.common.exceptions import JavascriptException
 from selenium.webdriver import Chrome
@@ -14,25 +14,23 @@ from flathunter.chrome_wrapper import get_chrome_driver
 from flathunter.exceptions import DriverLoadException
 
 STATIC_URL_PATTERN = re.compile(r'https://www\.immobilienscout24\.de')
-
-def get_result_count(soup: BeautifulSoup) -> int:
-    """Scrape the result count from the returned page"""
-    def is_result_count_element(element) -> bool:
-        if not isinstance(element, Tag):
-            return False
-        if not element.has_attr('data-is24-qa'):
-            return False
-        return element.attrs['data-is24-qa'] == 'resultlist-resultCount'
-
-    count_element = soup.find(is_result_count_element)
-    if not isinstance(count_element, Tag):
+RESULT_COUNT_PATTERN = re.compile(r'data-is24-qa="resultlist-resultCount"[^>]*>\s*([\d.]+)')
+
+def get_result_count(content: Union[bytes, str]) -> int:
+    """Scrape the result count from the raw HTML of the returned page. The count is
+       outside of the result list, so it is not in the strained soup"""
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', errors='replace')
+    count_match = RESULT_COUNT_PATTERN.search(content)
+    if count_match is None:
         return 0
-    return int(count_element.text.replace('.', ''))
+    return int(count_match[1].replace('.', ''))
 
 class Immobilienscout(Crawler):
     """Implementation of Crawler interface for ImmobilienScout"""
 
     URL_PATTERN = STATIC_URL_PATTERN
+    RESULTS_STRAINER = SoupStrainer(id='resultListItems')
 
     JSON_PATH_PARSER_ENTRIES = parse("$..['resultlist.realEstate']")
     JSON_PATH_PARSER_IMAGES = parse("$..galleryAttachments"
@@ -59,13 +57,13 @@ class Immobilienscout(Crawler):
 
     def get_driver(self) -> Optional[Chrome]:
         """Lazy method to fetch the driver as required at runtime"""
-        if self.driver is not None:
-            return self.driver
         if not (self.config.captcha_enabled() and self.captcha_solver):
             return None
-        driver_arguments = self.config.captcha_driver_arguments()
-        self.driver = get_chrome_driver(driver_arguments)
-        return self.driver
+        with self.driver_lock:
+            if self.driver is None:
+                driver_arguments = self.config.captcha_driver_arguments()
+                self.driver = get_chrome_driver(driver_arguments)
+            return self.driver
 
     def get_driver_force(self) -> Chrome:
         """Fetch the driver, and throw an exception if it is not configured or available"""
@@ -74,48 +72,58 @@ class Immobilienscout(Crawler):
             raise DriverLoadException("Unable to load chrome driver when expected")
         return res
 
-    def get_results(self, search_url, max_pages=None):
-        """Loads the exposes from the ImmoScout site, starting at the provided URL"""
+    def get_results(self, search_url, max_pages=None, seen=None):
+        """Loads the exposes from the ImmoScout site, starting at the provided URL. Only
+           incremental crawls load further pages: until RESULT_LIMIT exposes were found,
+           or until a page holds only processed exposes"""
         # convert to paged URL
         # if '/P-' in search_url:
         #     search_url = re.sub(r"/Suche/(.+?)/P-\d+", "/Suche/\1/P-{0}", search_url)
         # else:
         #     search_url = re.sub(r"/Suche/(.+?)/", r"/Suche/\1/P-{0}/", search_url)
         if '&pagenumber' in search_url:
-            search_url = re.sub(r"&pagenumber=[0-9]", "&pagenumber={0}", search_url)
+            search_url = re.sub(r"&pagenumber=[0-9]+", "&pagenumber={0}", search_url)
         else:
             search_url = search_url + '&pagenumber={0}'
         logger.debug("Got search URL %s", search_url)
 
         # load first page to get number of entries
         page_no = 1
-        soup = self.get_page(search_url, self.get_driver(), page_no)
-
-        # If we are using Selenium, just parse the results from the JSON in the page response
-        if self.get_driver() is not None:
-            return self.get_entries_from_javascript()
-
-        no_of_results = get_result_count(soup)
+        (entries, no_of_results) = self._load_results_page(search_url, page_no)
+        if seen is None:
+            return entries
+        cur_entry = entries
 
-        # get data from first page
-        entries = self.extract_data(soup)
-
-        # iterate over all remaining pages
+        # iterate over all remaining pages, until a page holds only processed exposes
         while len(entries) < min(no_of_results, self.RESULT_LIMIT) and \
                 (max_pages is None or page_no < max_pages):
+            if self._page_is_known(cur_entry, seen):
+                logger.debug('Page %d holds no new exposes - not loading more pages', page_no)
+                break
             logger.debug(
                 '(Next page) Number of entries: %d / Number of results: %d',
                 len(entries), no_of_results)
             page_no += 1
-            soup = self.get_page(search_url, self.get_driver(), page_no)
-            cur_entry = self.extract_data(soup)
-            if isinstance(cur_entry, list):
+            (cur_entry, _) = self._load_results_page(search_url, page_no)
+            if not cur_entry:
                 break
             entries.extend(cur_entry)
         return entries
 
-    def get_entries_from_javascript(self):
-        """Get entries from JavaScript"""
+    def _load_results_page(self, search_url, page_no) -> Tuple[List[Dict], int]:
+        """Loads a page of results, and the total number of results"""
+        # If we are using Selenium, just parse the results from the JSON in the page response.
+        # No other thread may load a page in the driver before the JSON has been read
+        driver = self.get_driver()
+        if driver is not None:
+            with self.driver_lock:
+                self.get_page_content(search_url, driver, page_no)
+                return self.get_entries_from_javascript()
+        content = self.get_page_content(search_url, None, page_no)
+        return (self._extract_data_from_content(content), get_result_count(content))
+
+    def get_entries_from_javascript(self) -> Tuple[List[Dict], int]:
+        """Get entries, and the total number of results, from JavaScript"""
         try:
             result_json = self.get_driver_force().execute_script('return window.IS24.resultList;')
         except JavascriptException:
@@ -124,8 +132,8 @@ class Immobilienscout(Crawler):
                 logger.error(
                     "IS24 bot detection has identified our script as a bot - we've been blocked"
                 )
-            return []
-        return self.get_entries_from_json(result_json)
+            return ([], 0)
+        return (self.get_entries_from_json(result_json), int(result_json.get('numberOfHits', 0)))
 
     def get_entries_from_json(self, json):
         """Get entries from JSON"""
@@ -169,9 +177,9 @@ class Immobilienscout(Crawler):
         """Sets request header cookie parameter to identify as a logged in user"""
         self.HEADERS['Cookie'] = f'reese84:${self.config["immoscout_cookie"]}'
 
-    def get_page(self, search_url, driver=None, page_no=None):
-        """Applies a page number to a formatted search URL and fetches the exposes at that page"""
-        return self.get_soup_from_url(
+    def get_page_content(self, search_url, driver=None, page_no=None):
+        """Applies a page number to a formatted search URL and fetches the raw HTML at that page"""
+        return self.get_content_from_url(
             search_url.format(page_no),
             driver=driver,
             checkbox=self.checkbox,
@@ -195,9 +203,8 @@ class Immobilienscout(Crawler):
         entries = []
 
         results_list = soup.find(id="resultListItems")
-        title_elements = results_list.find_all(
-            lambda e: e.name == 'a' and e.has_attr('class') and \
-                      'result-list-entry__brand-title-container' in e['class']
+        title_elements = results_list.select(
+            'a.result-list-entry__brand-title-container'
         ) if results_list else []
         expose_ids = []
         expose_urls = []
@@ -210,15 +217,9 @@ class Immobilienscout(Crawler):
             else:
                 expose_urls.append(link.get('href'))
 
-        attr_container_els = soup.find_all(
-            lambda e: e.has_attr('data-is24-qa') and e['data-is24-qa'] == "attributes"
-        )
-        address_fields = soup.find_all(
-            lambda e: e.has_attr('class') and 'result-list-entry__address' in e['class']
-        )
-        gallery_elements = soup.find_all(
-            lambda e: e.has_attr('class') and 'result-list-entry__gallery-container' in e['class']
-        )
+        attr_container_els = soup.select('[data-is24-qa="attributes"]')
+        address_fields = soup.select('.result-list-entry__address')
+        gallery_elements = soup.select('.result-list-entry__gallery-container')
         for idx, title_el in enumerate(title_elements):
             attr_els = attr_container_els[idx].find_all('dd')
             try:
@@ -3,7 +3,7 @@ import re
 import datetime
 from typing import Optional
 
-from bs4 import Tag
+from bs4 import SoupStrainer, Tag
 from selenium.webdriver import Chrome
 
 from flathunter.abstract_crawler import Crawler
@@ -15,6 +15,7 @@ class Kleinanzeigen(Crawler):
     """Implementation of Crawler interface for Ebay Kleinanzeigen"""
 
     URL_PATTERN = re.compile(r'https://www\.kleinanzeigen\.de')
+    RESULTS_STRAINER = SoupStrainer(id='srchrslt-adtable')
     MONTHS = {
         "Januar": "01",
         "Februar": "02",
@@ -38,11 +39,11 @@ class Kleinanzeigen(Crawler):
 
     def get_driver(self) -> Optional[Chrome]:
         """Lazy method to fetch the driver as required at runtime"""
-        if self.driver is not None:
+        with self.driver_lock:
+            if self.driver is None:
+                driver_arguments = self.config.captcha_driver_arguments()
+                self.driver = get_chrome_driver(driver_arguments)
             return self.driver
-        driver_arguments = self.config.captcha_driver_arguments()
-        self.driver = get_chrome_driver(driver_arguments)
-        return self.driver
 
     def get_driver_force(self) -> Chrome:
         """Fetch the driver, and throw an exception if it is not configured or available"""
@@ -51,9 +52,9 @@ class Kleinanzeigen(Crawler):
             raise DriverLoadException("Unable to load chrome driver when expected")
         return res
 
-    def get_page(self, search_url, driver=None, page_no=None):
-        """Applies a page number to a formatted search URL and fetches the exposes at that page"""
-        return self.get_soup_from_url(search_url, driver=self.get_driver())
+    def get_page_content(self, search_url, driver=None, page_no=None):
+        """Applies a page number to a formatted search URL and fetches the raw HTML at that page"""
+        return self.get_content_from_url(search_url, driver=self.get_driver())
 
     def get_expose_details(self, expose):
         soup = self.get_page(expose['url'], self.get_driver())
@@ -72,12 +73,11 @@ class Kleinanzeigen(Crawler):
         entries = []
         soup = soup.find(id="srchrslt-adtable")
 
-        try:
-            title_elements = soup.find_all(lambda e: e.has_attr('class')
-                                           and 'ellipsis' in e['class'])
-        except AttributeError:
+        if soup is None:
             return entries
 
+        title_elements = soup.select('.ellipsis')
+
         expose_ids = soup.find_all("article", class_="aditem")
 
         for idx, title_el in enumerate(title_elements):
@@ -2,6 +2,8 @@
 import re
 import json
 
+from bs4 import SoupStrainer
+
 from flathunter.logging import logger
 from flathunter.abstract_crawler import Crawler
 
@@ -9,6 +11,7 @@ class Subito(Crawler):
     """Implementation of Crawler interface for Subito"""
 
     URL_PATTERN = re.compile(r'https://www\.subito\.it')
+    RESULTS_STRAINER = SoupStrainer('script', id='__NEXT_DATA__')
 
     def __init__(self, config):
         super().__init__(config)
@@ -2,7 +2,7 @@
 import re
 import hashlib
 
-from bs4 import BeautifulSoup, Tag
+from bs4 import BeautifulSoup, SoupStrainer, Tag
 
 from flathunter.logging import logger
 from flathunter.abstract_crawler import Crawler
@@ -13,6 +13,7 @@ class VrmImmo(Crawler):
 
     BASE_URL = "https://vrm-immo.de"
     URL_PATTERN = re.compile(r'https://vrm-immo\.de')
+    RESULTS_STRAINER = SoupStrainer('div', {'class': 'item-wrap js-serp-item'})
 
     def __init__(self, config):
         super().__init__(config)
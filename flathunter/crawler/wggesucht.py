@@ -2,8 +2,7 @@
 import re
 from typing import Optional, List, Dict, Any, Union
 
-import requests
-from bs4 import BeautifulSoup, Tag
+from bs4 import BeautifulSoup, SoupStrainer, Tag
 
 from flathunter.logging import logger
 from flathunter.abstract_crawler import Crawler
@@ -165,6 +164,8 @@ class WgGesucht(Crawler):
 
     URL_PATTERN = re.compile(r'https://www\.wg-gesucht\.de')
 
+    RESULTS_STRAINER = SoupStrainer(id='main_column')
+
     def __init__(self, config):
         super().__init__(config)
         self.config = config
@@ -202,20 +203,20 @@ class WgGesucht(Crawler):
             return None
         return ' '.join(a_element.text.strip().split())
 
-    def get_soup_from_url(
+    def get_content_from_url(
             self,
             url: str,
             driver: Optional[Any] = None,
             checkbox: bool = False,
-            afterlogin_string: Optional[str] = None) -> BeautifulSoup:
+            afterlogin_string: Optional[str] = None) -> Union[bytes, str]:
         """
-        Creates a Soup object from the HTML at the provided URL
+        Fetches the raw HTML at the provided URL
 
         Overwrites the method inherited from abstract_crawler. This is
         necessary as we need to reload the page once for all filters to
         be applied correctly on wg-gesucht.
         """
-        sess = requests.session()
+        sess = self._get_session()
         # First page load to set filters; response is discarded
         sess.get(url, headers=self.HEADERS)
         # Second page load
@@ -225,13 +226,7 @@ class WgGesucht(Crawler):
             logger.error("Got response (%i): %s",
                          resp.status_code, resp.content)
         if self.config.use_proxy():
-            return self.get_soup_with_proxy(url)
+            return self.get_content_with_proxy(url)
         if driver is not None:
-            driver.get(url)
-            if re.search("initGeetest", driver.page_source):
-                self.resolve_geetest(driver)
-            elif re.search("g-recaptcha", driver.page_source):
-                self.resolve_recaptcha(
-                    driver, checkbox, afterlogin_string or "")
-            return BeautifulSoup(driver.page_source, 'lxml')
-        return BeautifulSoup(resp.content, 'lxml')
+            return self._get_content_with_driver(url, driver, checkbox, afterlogin_string)
+        return resp.content
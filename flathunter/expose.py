@@ -0,0 +1,113 @@
+"""Typed record for the exposes found by the crawlers"""
+import re
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+NUMBER_PATTERN = re.compile(r'\d+([\.,]\d+)?')
+
+
+def parse_price(text: str) -> Optional[float]:
+    """Extracts the price from a price text. Dots are thousands separators"""
+    price_match = NUMBER_PATTERN.search(text)
+    if price_match is None:
+        return None
+    return float(price_match[0].replace(".", "").replace(",", "."))
+
+
+def parse_decimal(text: str) -> Optional[float]:
+    """Extracts a size or number of rooms from a text. Dots and commas are decimal marks"""
+    number_match = NUMBER_PATTERN.search(text)
+    if number_match is None:
+        return None
+    return float(number_match[0].replace(",", "."))
+
+
+NUMERIC_FIELDS = {'price': parse_price, 'size': parse_decimal, 'rooms': parse_decimal}
+
+
+class Expose(MutableMapping):
+    """An expose, as found by a crawler. Behaves like the dictionary the crawlers
+       return, but keeps the common fields in slots, and parses the price, size and
+       rooms texts once, when they are set, into 'price_value', 'size_value' and
+       'rooms_value' (None if the text holds no number). Other fields are kept in an
+       extra dictionary, created when the first one is set"""
+
+    FIELDS = ('id', 'crawler', 'title', 'url', 'price', 'size', 'rooms', 'address',
+              'image', 'images')
+    FIELD_SET = frozenset(FIELDS)
+
+    __slots__ = FIELDS + ('price_value', 'size_value', 'rooms_value', 'extra')
+
+    def __init__(self, fields: Optional[Mapping[str, Any]] = None):
+        self.price_value = None
+        self.size_value = None
+        self.rooms_value = None
+        self.extra = None
+        if fields is not None:
+            for (key, value) in fields.items():
+                self[key] = value
+
+    @classmethod
+    def from_dict(cls, expose):
+        """Wrap a dictionary returned by a crawler. Exposes are returned as they are"""
+        if isinstance(expose, Expose):
+            return expose
+        return cls(expose)
+
+    def __getitem__(self, key):
+        if key in self.FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self.extra is None:
+            raise KeyError(key)
+        return self.extra[key]
+
+    def __setitem__(self, key, value):
+        if key in self.FIELD_SET:
+            setattr(self, key, value)
+            if key in NUMERIC_FIELDS:
+                try:
+                    number = NUMERIC_FIELDS[key](value)
+                except TypeError:
+                    number = None
+                setattr(self, key + '_value', number)
+            return
+        if self.extra is None:
+            self.extra = {}
+        self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self.FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+            if key in NUMERIC_FIELDS:
+                setattr(self, key + '_value', None)
+            return
+        if self.extra is None:
+            raise KeyError(key)
+        del self.extra[key]
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.FIELDS:
+            if hasattr(self, key):
+                yield key
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f'Expose({self.to_dict()!r})'
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The expose as a plain dictionary, for serialisation"""
+        return dict(self)
+
+    def copy(self):
+        """A shallow copy of the expose"""
+        return Expose(self)
@@ -1,139 +1,213 @@
 """Module with implementations of standard expose filters"""
-from functools import reduce
 import re
 from abc import ABC, ABCMeta
+from functools import cached_property
 from typing import List, Any
 
-
-class AbstractFilter(ABC):
-    """Abstract base class for filters"""
-
-    def is_interesting(self, _expose):
-        """Return True if an expose should be included in the output, False otherwise"""
-        return True
+from flathunter.expose import Expose, parse_decimal, parse_price
 
 
 class ExposeHelper:
-    """Helper functions for extracting data from expose text"""
+    """Helper functions for extracting data from expose text. Exposes wrapped in the
+       Expose record carry their numbers already parsed"""
 
     @staticmethod
     def get_price(expose):
         """Extracts the price from a price text"""
-        price_match = re.search(r'\d+([\.,]\d+)?', expose['price'])
-        if price_match is None:
-            return None
-        return float(price_match[0].replace(".", "").replace(",", "."))
+        if isinstance(expose, Expose):
+            return expose.price_value
+        return parse_price(expose['price'])
 
     @staticmethod
     def get_size(expose):
         """Extracts the size from a size text"""
-        size_match = re.search(r'\d+([\.,]\d+)?', expose['size'])
-        if size_match is None:
-            return None
-        return float(size_match[0].replace(",", "."))
+        if isinstance(expose, Expose):
+            return expose.size_value
+        return parse_decimal(expose['size'])
 
     @staticmethod
     def get_rooms(expose):
         """Extracts the number of rooms from a room text"""
-        rooms_match = re.search(r'\d+([\.,]\d+)?', expose['rooms'])
-        if rooms_match is None:
-            return None
-        return float(rooms_match[0].replace(",", "."))
+        if isinstance(expose, Expose):
+            return expose.rooms_value
+        return parse_decimal(expose['rooms'])
+
+
+class ParsedExpose:
+    """An expose with its numeric fields parsed on first use, so that several filters
+       on the same field parse it only once"""
+
+    def __init__(self, expose):
+        self.expose = expose
+
+    @cached_property
+    def price(self):
+        """The price of the expose, or None if it can not be parsed"""
+        return ExposeHelper.get_price(self.expose)
+
+    @cached_property
+    def size(self):
+        """The size of the expose, or None if it can not be parsed"""
+        return ExposeHelper.get_size(self.expose)
+
+    @cached_property
+    def rooms(self):
+        """The number of rooms of the expose, or None if it can not be parsed"""
+        return ExposeHelper.get_rooms(self.expose)
+
+
+class AbstractFilter(ABC):
+    """Abstract base class for filters"""
+
+    # Relative cost of evaluating the filter. Filters are applied cheapest first
+    COST = 5
+
+    # Filters with side effects, which have to see every expose. They are applied
+    # before all other filters
+    STATEFUL = False
+
+    def is_interesting(self, _expose):
+        """Return True if an expose should be included in the output, False otherwise"""
+        return True
+
+    def is_interesting_parsed(self, parsed: ParsedExpose) -> bool:
+        """Apply the filter to an expose whose numeric fields may already be parsed"""
+        return self.is_interesting(parsed.expose)
+
+    def are_interesting(self, exposes):
+        """Apply the filter to a list of exposes, returning one boolean per expose"""
+        return [self.is_interesting(expose) for expose in exposes]
+
+
+class NumericFilter(AbstractFilter):
+    """Base class for filters on the parsed numeric fields of an expose"""
+
+    COST = 1
+
+    def is_interesting(self, expose):
+        """Apply the filter to an expose"""
+        return self.is_interesting_parsed(ParsedExpose(expose))
 
 
 class AlreadySeenFilter(AbstractFilter):
-    """Filter exposes that have already been processed"""
+    """Filter exposes that have already been processed. Every expose checked is marked
+       as processed, so the filter is stateful"""
+
+    STATEFUL = True
 
     def __init__(self, id_watch):
         self.id_watch = id_watch
 
     def is_interesting(self, expose):
         """Returns true if an expose should be kept in the pipeline"""
-        if not self.id_watch.is_processed(expose['id']):
-            self.id_watch.mark_processed(expose['id'])
+        crawler = expose.get('crawler')
+        if not self.id_watch.is_processed(expose['id'], crawler):
+            self.id_watch.mark_processed(expose['id'], crawler)
             return True
         return False
 
-
-class MaxPriceFilter(AbstractFilter):
+    def are_interesting(self, exposes):
+        """Check a list of exposes with one lookup, and mark the new ones with one write,
+           per crawler. Repeated exposes within the list are only kept once"""
+        ids_by_crawler = {}
+        for expose in exposes:
+            ids_by_crawler.setdefault(expose.get('crawler'), []).append(expose['id'])
+        seen = {crawler: self.id_watch.is_processed_many(expose_ids, crawler)
+                for (crawler, expose_ids) in ids_by_crawler.items()}
+        new_ids = {crawler: [] for crawler in ids_by_crawler}
+        results = []
+        for expose in exposes:
+            crawler = expose.get('crawler')
+            is_new = expose['id'] not in seen[crawler]
+            if is_new:
+                seen[crawler].add(expose['id'])
+                new_ids[crawler].append(expose['id'])
+            results.append(is_new)
+        for (crawler, expose_ids) in new_ids.items():
+            if expose_ids:
+                self.id_watch.mark_processed_many(expose_ids, crawler)
+        return results
+
+
+class MaxPriceFilter(NumericFilter):
     """Exclude exposes above a given price"""
 
     def __init__(self, max_price):
         self.max_price = max_price
 
-    def is_interesting(self, expose):
+    def is_interesting_parsed(self, parsed):
         """True if expose is below the max price"""
-        price = ExposeHelper.get_price(expose)
+        price = parsed.price
         if price is None:
             return True
         return price <= self.max_price
 
 
-class MinPriceFilter(AbstractFilter):
+class MinPriceFilter(NumericFilter):
     """Exclude exposes below a given price"""
 
     def __init__(self, min_price):
         self.min_price = min_price
 
-    def is_interesting(self, expose):
+    def is_interesting_parsed(self, parsed):
         """True if expose is above the min price"""
-        price = ExposeHelper.get_price(expose)
+        price = parsed.price
         if price is None:
             return True
         return price >= self.min_price
 
 
-class MaxSizeFilter(AbstractFilter):
+class MaxSizeFilter(NumericFilter):
     """Exclude exposes above a given size"""
 
     def __init__(self, max_size):
         self.max_size = max_size
 
-    def is_interesting(self, expose):
+    def is_interesting_parsed(self, parsed):
         """True if expose is below the max size"""
-        size = ExposeHelper.get_size(expose)
+        size = parsed.size
         if size is None:
             return True
         return size <= self.max_size
 
 
-class MinSizeFilter(AbstractFilter):
+class MinSizeFilter(NumericFilter):
     """Exclude exposes below a given size"""
 
     def __init__(self, min_size):
         self.min_size = min_size
 
-    def is_interesting(self, expose):
+    def is_interesting_parsed(self, parsed):
         """True if expose is above the min size"""
-        size = ExposeHelper.get_size(expose)
+        size = parsed.size
         if size is None:
             return True
         return size >= self.min_size
 
 
-class MaxRoomsFilter(AbstractFilter):
+class MaxRoomsFilter(NumericFilter):
     """Exclude exposes above a given number of rooms"""
 
     def __init__(self, max_rooms):
         self.max_rooms = max_rooms
 
-    def is_interesting(self, expose):
+    def is_interesting_parsed(self, parsed):
         """True if expose is below the max number of rooms"""
-        rooms = ExposeHelper.get_rooms(expose)
+        rooms = parsed.rooms
         if rooms is None:
             return True
         return rooms <= self.max_rooms
 
 
-class MinRoomsFilter(AbstractFilter):
+class MinRoomsFilter(NumericFilter):
     """Exclude exposes below a given number of rooms"""
 
     def __init__(self, min_rooms):
         self.min_rooms = min_rooms
 
-    def is_interesting(self, expose):
+    def is_interesting_parsed(self, parsed):
         """True if expose is above the min number of rooms"""
-        rooms = ExposeHelper.get_rooms(expose)
+        rooms = parsed.rooms
         if rooms is None:
             return True
         return rooms >= self.min_rooms
@@ -142,30 +216,30 @@ class MinRoomsFilter(AbstractFilter):
 class TitleFilter(AbstractFilter):
     """Exclude exposes whose titles match the provided terms"""
 
+    COST = 3
+
     def __init__(self, filtered_titles):
         self.filtered_titles = filtered_titles
+        self.pattern = re.compile("(" + ")|(".join(filtered_titles) + ")", re.IGNORECASE)
 
     def is_interesting(self, expose):
         """True unless title matches the filtered titles"""
-        combined_excludes = "(" + ")|(".join(self.filtered_titles) + ")"
-        found_objects = re.search(
-            combined_excludes, expose['title'], re.IGNORECASE)
         # send all non matching regex patterns
-        if not found_objects:
-            return True
-        return False
+        return self.pattern.search(expose['title']) is None
 
 
-class PPSFilter(AbstractFilter):
+class PPSFilter(NumericFilter):
     """Exclude exposes above a given price per square"""
 
+    COST = 2
+
     def __init__(self, max_pps):
         self.max_pps = max_pps
 
-    def is_interesting(self, expose):
+    def is_interesting_parsed(self, parsed):
         """True if price per square is below max price per square"""
-        size = ExposeHelper.get_size(expose)
-        price = ExposeHelper.get_price(expose)
+        size = parsed.size
+        price = parsed.price
         if size is None or price is None:
             return True
         pps = price / size
@@ -209,22 +283,43 @@ class FilterBuilder:
 
 
 class Filter:
-    """Abstract filter object"""
+    """Abstract filter object. The filters are compiled into an evaluation order:
+       stateful filters first, as they have to see every expose, then the others
+       cheapest first, stopping at the first filter that rejects the expose"""
 
     filters: List[AbstractFilter]
 
     def __init__(self, filters: List[AbstractFilter]):
         self.filters = filters
+        self.stateful_filters = [f for f in filters if f.STATEFUL]
+        self.predicates = sorted((f for f in filters if not f.STATEFUL),
+                                 key=lambda f: f.COST)
 
     def is_interesting_expose(self, expose):
         """Apply all filters to this expose"""
-        return reduce((lambda x, y: x and y),
-                      map((lambda x: x.is_interesting(expose)), self.filters), True)
+        interesting = True
+        for expose_filter in self.stateful_filters:
+            interesting = expose_filter.is_interesting(expose) and interesting
+        return interesting and self.passes_predicates(expose)
+
+    def passes_predicates(self, expose):
+        """Apply the filters without side effects, parsing the expose only once"""
+        parsed = ParsedExpose(expose)
+        return all(predicate.is_interesting_parsed(parsed) for predicate in self.predicates)
 
     def filter(self, exposes):
         """Apply all filters to every expose in the list"""
         return filter(self.is_interesting_expose, exposes)
 
+    def filter_batch(self, exposes):
+        """Apply all filters to a list of exposes. The stateful filters process the
+           whole list at once; the others only see the exposes still kept"""
+        keep = [True] * len(exposes)
+        for expose_filter in self.stateful_filters:
+            keep = [x and y for (x, y) in zip(keep, expose_filter.are_interesting(exposes))]
+        return [expose for (expose, interesting) in zip(exposes, keep)
+                if interesting and self.passes_predicates(expose)]
+
     @staticmethod
     def builder():
         """Return a new filter builder"""
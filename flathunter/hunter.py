@@ -1,6 +1,8 @@
 """Default Flathunter implementation for the command line"""
+import threading
 import traceback
-from itertools import chain
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
 import requests
 
 from flathunter.logging import logger
@@ -13,28 +15,73 @@ from flathunter.exceptions import ConfigException
 class Hunter:
     """Basic methods for crawling and processing / filtering exposes"""
 
+    # Errors that end the crawl of one URL, without affecting the other URLs
+    CRAWL_ERRORS = (CaptchaUnsolvableError, requests.exceptions.RequestException)
+
     def __init__(self, config: YamlConfig, id_watch):
         self.config = config
         if not isinstance(self.config, YamlConfig):
             raise ConfigException(
                 "Invalid config for hunter - should be a 'Config' object")
         self.id_watch = id_watch
+        self.parser_pool = self.config.parser_pool()
+        if self.parser_pool is not None:
+            self.parser_pool.start()
+
+    def close(self):
+        """Release the resources held by the hunter: stops the parser processes"""
+        if self.parser_pool is not None:
+            self.parser_pool.shutdown()
 
     def crawl_for_exposes(self, max_pages=None):
-        """Trigger a new crawl of the configured URLs"""
-        def try_crawl(searcher, url, max_pages):
-            try:
-                return searcher.crawl(url, max_pages)
-            except CaptchaUnsolvableError:
-                logger.info("Error while scraping url %s: the captcha was unsolvable", url)
-                return []
-            except requests.exceptions.RequestException:
-                logger.info("Error while scraping url %s:\n%s", url, traceback.format_exc())
-                return []
-
-        return chain(*[try_crawl(searcher, url, max_pages)
-                       for searcher in self.config.searchers()
-                       for url in self.config.target_urls()])
+        """Trigger a new crawl of the configured URLs. URLs are crawled in parallel, and
+           the exposes from each URL are yielded as soon as that URL has been crawled"""
+        jobs = []
+        for url in self.config.target_urls():
+            searcher = self.config.get_crawler_for_url(url)
+            if searcher is None:
+                logger.warning("No crawler available for url %s - skipping", url)
+                continue
+            jobs.append((searcher, url, self.seen_predicate(searcher)))
+        return self.crawl_with_threads(jobs, max_pages)
+
+    def seen_predicate(self, searcher):
+        """When crawling incrementally, the function that returns which of a list of
+           expose IDs the searcher has already processed"""
+        if not self.config.crawl_incremental():
+            return None
+        crawler = searcher.get_name()
+        return lambda expose_ids: self.id_watch.is_processed_many(expose_ids, crawler)
+
+    @staticmethod
+    def crawl_failed(url, error):
+        """Log an error that ended the crawl of a URL. Call from the except block; the URL
+           yields no exposes"""
+        if isinstance(error, CaptchaUnsolvableError):
+            logger.info("Error while scraping url %s: the captcha was unsolvable", url)
+        else:
+            logger.info("Error while scraping url %s:\n%s", url, traceback.format_exc())
+        return []
+
+    def crawl_with_threads(self, jobs, max_pages=None):
+        """Crawl the (searcher, url, seen) jobs in a pool of worker threads"""
+        host_locks = {urlparse(url).netloc:
+                          threading.BoundedSemaphore(self.config.crawl_max_workers_per_host())
+                      for (_, url, _) in jobs}
+
+        def try_crawl(searcher, url, seen):
+            with host_locks[urlparse(url).netloc]:
+                try:
+                    return searcher.crawl(url, max_pages, seen)
+                except self.CRAWL_ERRORS as error:
+                    return self.crawl_failed(url, error)
+
+        with ThreadPoolExecutor(max_workers=self.config.crawl_max_workers(),
+                                thread_name_prefix='crawler') as executor:
+            futures = [executor.submit(try_crawl, searcher, url, seen)
+                       for (searcher, url, seen) in jobs]
+            for future in as_completed(futures):
+                yield from future.result()
 
     def hunt_flats(self, max_pages=None):
         """Crawl, process and filter exposes"""
@@ -57,4 +104,5 @@ class Hunter:
             logger.info('New offer: %s', expose['title'])
             result.append(expose)
 
+        self.id_watch.prune()
         return result
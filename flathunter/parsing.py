@@ -0,0 +1,50 @@
+"""Parsing of fetched result pages. Pages can be parsed in a pool of worker processes,
+   so that the CPU-bound parsing of many pages runs in parallel with the crawling"""
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Union
+
+from bs4 import BeautifulSoup
+
+
+def parse_results_page(crawler_class, content: Union[bytes, str]) -> List[Dict]:
+    """Extract the exposes from the raw HTML of a results page, using the 'extract_data'
+       method of the crawler class. This is a module-level function, so that it can be
+       pickled and run in a worker process. The crawler instance is created without
+       calling its constructor, so 'extract_data' must not depend on instance state.
+       Only the part of the page matched by the crawler's RESULTS_STRAINER is parsed"""
+    crawler = crawler_class.__new__(crawler_class)
+    return crawler.extract_data(
+        BeautifulSoup(content, 'lxml', parse_only=crawler_class.RESULTS_STRAINER))
+
+
+class ParserPool:
+    """Pool of worker processes that parse raw result pages into exposes. Forking a
+       process while crawler threads are running can leave locks in the children held
+       forever, so the Hunter starts all workers from the main thread before crawling,
+       and shuts them down when it is closed"""
+
+    def __init__(self, processes: int):
+        self.processes = processes
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.lock = threading.Lock()
+
+    def start(self) -> ProcessPoolExecutor:
+        """Start the worker processes, unless they are running already"""
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.processes)
+                # the workers are only started by the first task - start them now
+                self.executor.submit(int).result()
+            return self.executor
+
+    def parse(self, crawler_class, content: Union[bytes, str]) -> List[Dict]:
+        """Parse a results page in one of the worker processes and wait for the result"""
+        return self.start().submit(parse_results_page, crawler_class, content).result()
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
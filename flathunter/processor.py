@@ -1,6 +1,8 @@
 """Utility classes for building chains for processors"""
+import queue
+import threading
 from functools import reduce
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Union
 
 from flathunter.default_processors import AddressResolver
 from flathunter.default_processors import Filter
@@ -17,27 +19,38 @@ from flathunter.abstract_processor import Processor
 class ProcessorChainBuilder:
     """Builder pattern for building chains of processors"""
     processors: List[Processor]
+    workers: List[int]
 
     def __init__(self, config):
         self.processors = []
+        self.workers = []
         self.config = config
 
+    def add_stage(self, processor, stage=None):
+        """Append a processor to the chain. Processors that implement 'process_batch' are
+           passed batches of the configured size. In pipeline mode, the stage name selects
+           the number of worker threads; stages without a name run in a single thread"""
+        if processor.supports_batches() and self.config.batch_size() > 1:
+            processor.set_batching(self.config.batch_size(), self.config.batch_flush_timeout())
+        self.processors.append(processor)
+        self.workers.append(self.config.pipeline_workers(stage) if stage is not None else 1)
+
     def send_messages(self, receivers=None):
         """Add processor that sends messages for exposes"""
         notifiers = self.config.notifiers()
         if 'telegram' in notifiers:
-            self.processors.append(SenderTelegram(self.config, receivers=receivers))
+            self.add_stage(SenderTelegram(self.config, receivers=receivers), 'send_messages')
         if 'mattermost' in notifiers:
-            self.processors.append(SenderMattermost(self.config))
+            self.add_stage(SenderMattermost(self.config), 'send_messages')
         if 'apprise' in notifiers:
-            self.processors.append(SenderApprise(self.config))
+            self.add_stage(SenderApprise(self.config), 'send_messages')
         if 'slack' in notifiers:
-            self.processors.append(SenderSlack(self.config))
+            self.add_stage(SenderSlack(self.config), 'send_messages')
         return self
 
     def resolve_addresses(self):
         """Add processor that resolves addresses from expose pages"""
-        self.processors.append(AddressResolver(self.config))
+        self.add_stage(AddressResolver(self.config), 'resolve_addresses')
         return self
 
     def calculate_durations(self):
@@ -45,31 +58,34 @@ class ProcessorChainBuilder:
         durations_enabled = "google_maps_api" in self.config \
                             and self.config["google_maps_api"]["enable"]
         if durations_enabled:
-            self.processors.append(GMapsDurationProcessor(self.config))
+            self.add_stage(GMapsDurationProcessor(self.config), 'calculate_durations')
         return self
 
     def crawl_expose_details(self):
         """Add processor to crawl expose details"""
-        self.processors.append(CrawlExposeDetails(self.config))
+        self.add_stage(CrawlExposeDetails(self.config), 'crawl_expose_details')
         return self
 
     def map(self, func):
         """Add processor that applies a lambda to exposes"""
-        self.processors.append(LambdaProcessor(self.config, func))
+        self.add_stage(LambdaProcessor(self.config, func))
         return self
 
     def apply_filter(self, filter_set):
         """Add processor that applies a filter to expose sequence"""
-        self.processors.append(Filter(self.config, filter_set))
+        self.add_stage(Filter(self.config, filter_set))
         return self
 
     def save_all_exposes(self, id_watch):
         """Add processor that saves all exposes to disk"""
-        self.processors.append(SaveAllExposesProcessor(self.config, id_watch))
+        self.add_stage(SaveAllExposesProcessor(self.config, id_watch))
         return self
 
     def build(self):
         """Build the processor chain"""
+        if self.config.pipeline_enabled():
+            return PipelinedProcessorChain(self.processors, self.workers,
+                                           self.config.pipeline_queue_size())
         return ProcessorChain(self.processors)
 
 class ProcessorChain:
@@ -79,12 +95,126 @@ class ProcessorChain:
     def __init__(self, processors):
         self.processors = processors
 
-    def process(self, exposes):
+    def process(self, exposes: Iterable[Dict]) -> Iterator[Dict]:
         """Process the sequences of exposes with the processor chain"""
-        return reduce((lambda exposes, processor: processor.process_exposes(exposes)),
-                      self.processors, exposes)
+        return iter(reduce((lambda exposes, processor: processor.process_exposes(exposes)),
+                           self.processors, exposes))
 
     @staticmethod
     def builder(config):
         """Return a new processor chain builder"""
         return ProcessorChainBuilder(config)
+
+
+class _EndOfStream:
+    """Put on a pipeline queue after the last expose"""
+
+
+_DONE = _EndOfStream()
+
+
+class PipelinedProcessorChain(ProcessorChain):
+    """Processor chain that runs every processor in its own stage of worker threads.
+       Stages are connected by bounded queues, so a slow stage only holds back the
+       exposes that have not passed it yet, and can be scaled out with more workers.
+       Stages with more than one worker do not preserve the order of the exposes"""
+
+    POLL_TIMEOUT = 0.1
+
+    def __init__(self, processors, workers, queue_size):
+        super().__init__(processors)
+        self.workers = workers
+        self.queue_size = queue_size
+
+    def process(self, exposes: Iterable[Dict]) -> Iterator[Dict]:
+        """Process the sequence of exposes in the pipeline. The returned generator must
+           be consumed (or closed) to shut the pipeline down"""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.processors) + 1)]
+        stop = threading.Event()
+        errors = []
+        threads = [threading.Thread(target=self.feed, args=(exposes, queues[0], stop, errors),
+                                    name='pipeline-feed', daemon=True)]
+        for idx, processor in enumerate(self.processors):
+            remaining = [self.workers[idx]]
+            lock = threading.Lock()
+            for worker in range(self.workers[idx]):
+                threads.append(threading.Thread(
+                    target=self.run_stage,
+                    args=(processor, queues[idx], queues[idx + 1]),
+                    kwargs={'stop': stop, 'errors': errors, 'remaining': remaining,
+                            'lock': lock},
+                    name=f'pipeline-{type(processor).__name__}-{worker}', daemon=True))
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                expose = self.get(queues[-1], stop)
+                if isinstance(expose, _EndOfStream):
+                    break
+                yield expose
+            if errors:
+                raise errors[0]
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def put(self, target: queue.Queue, item: Union[Dict, _EndOfStream],
+            stop: threading.Event) -> bool:
+        """Put an item on a queue, giving up when the pipeline is shut down"""
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=self.POLL_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, source: queue.Queue, stop: threading.Event) -> Union[Dict, _EndOfStream]:
+        """Take an item from a queue, or the end of the stream when the pipeline is
+           shut down"""
+        while not stop.is_set():
+            try:
+                return source.get(timeout=self.POLL_TIMEOUT)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def drain(self, source: queue.Queue, stop: threading.Event) -> Iterator[Dict]:
+        """Yield the exposes arriving on a queue until the end of the stream"""
+        while True:
+            expose = self.get(source, stop)
+            if isinstance(expose, _EndOfStream):
+                # let the other workers of this stage see the end of the stream
+                self.put(source, _DONE, stop)
+                return
+            yield expose
+
+    def feed(self, exposes, target, stop, errors):
+        """Feed the exposes into the first stage of the pipeline"""
+        try:
+            for expose in exposes:
+                if not self.put(target, expose, stop):
+                    return
+            self.put(target, _DONE, stop)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            errors.append(error)
+            stop.set()
+
+    # pylint: disable=too-many-arguments
+    def run_stage(self, processor, source, target, *, stop, errors, remaining, lock):
+        """Worker loop of a pipeline stage. The last worker of a stage to finish signals
+           the next stage that no more exposes will follow"""
+        try:
+            for result in processor.process_exposes(self.drain(source, stop)):
+                if not self.put(target, result, stop):
+                    return
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            errors.append(error)
+            stop.set()
+        finally:
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self.put(target, _DONE, stop)
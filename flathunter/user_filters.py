@@ -0,0 +1,82 @@
+"""Evaluation of the filters of many website users against the same exposes at once"""
+from typing import Dict, List, Tuple
+
+from flathunter.config import YamlConfig
+from flathunter.filter import ParsedExpose, TitleFilter
+
+INFINITY = float('inf')
+NAN = float('nan')
+
+
+def expose_values(expose) -> Tuple[float, float, float, float]:
+    """The (price, size, rooms, price per square) of an expose, NaN where unknown"""
+    parsed = ParsedExpose(expose)
+
+    def read(field):
+        try:
+            value = getattr(parsed, field)
+        except (KeyError, TypeError, ValueError):
+            return NAN
+        return NAN if value is None else value
+    (price, size, rooms) = (read('price'), read('size'), read('rooms'))
+    pps = price / size if size else NAN
+    return (price, size, rooms, pps)
+
+
+def user_bounds(settings: Dict) -> Tuple[Tuple[float, ...], Tuple[float, ...], Tuple[str, ...]]:
+    """The lower and upper bounds on (price, size, rooms, price per square) and the
+       excluded titles in a user's settings. Missing bounds are infinite"""
+    config = YamlConfig(settings)
+    lower = (float(config.min_price() or -INFINITY), float(config.min_size() or -INFINITY),
+             float(config.min_rooms() or -INFINITY), -INFINITY)
+    upper = (float(config.max_price() or INFINITY), float(config.max_size() or INFINITY),
+             float(config.max_rooms() or INFINITY),
+             float(config.max_price_per_square() or INFINITY))
+    return (lower, upper, tuple(config.excluded_titles() or ()))
+
+
+class UserFilterMatrix:
+    """The numeric filters of all users as a matrix of lower and upper bounds on the
+       price, size, rooms and price per square of an expose, plus each user's title
+       filter. A value that is unknown (NaN) passes every bound, like in the filters.
+       Users with the same bounds share one evaluation"""
+
+    def __init__(self, user_settings: List[Tuple[int, Dict]]):
+        self.user_ids = []
+        self.lower = []
+        self.upper = []
+        self.title_filters = []
+        title_filters = {}
+        for (user_id, settings) in user_settings:
+            (lower, upper, titles) = user_bounds(settings)
+            self.user_ids.append(user_id)
+            self.lower.append(lower)
+            self.upper.append(upper)
+            if titles and titles not in title_filters:
+                title_filters[titles] = TitleFilter(list(titles))
+            self.title_filters.append(title_filters.get(titles))
+
+    def numeric_matches(self, values) -> List[List[bool]]:
+        """The user x expose matrix of the numeric filters, for the exposes' values"""
+        if not values or not self.user_ids:
+            return [[] for _ in self.user_ids]
+        rows = {}
+        matrix = []
+        for bounds in zip(self.lower, self.upper):
+            if bounds not in rows:
+                rows[bounds] = [all(not value < low and not value > high
+                                    for (value, low, high) in zip(expose, *bounds))
+                                for expose in values]
+            matrix.append(rows[bounds])
+        return matrix
+
+    def match(self, exposes) -> Dict[int, List[Dict]]:
+        """The exposes matching each user's filters"""
+        values = [expose_values(expose) for expose in exposes]
+        matches = {}
+        for (user_id, row, title_filter) in zip(self.user_ids, self.numeric_matches(values),
+                                                self.title_filters):
+            matches[user_id] = [expose for (expose, numeric_match) in zip(exposes, row)
+                                if numeric_match and
+                                (title_filter is None or title_filter.is_interesting(expose))]
+        return matches
@@ -0,0 +1,110 @@
+"""Index of website users by their filters, to find the users an expose matches"""
+from bisect import bisect_left, bisect_right
+import math
+import re
+from typing import Dict, List, Set, Tuple
+
+from flathunter.user_filters import INFINITY, expose_values, user_bounds
+
+
+class SortedBounds:
+    """The users with a bound on one value, sorted by the bound"""
+
+    def __init__(self):
+        self.bounds: List[float] = []
+        self.users: List[int] = []
+
+    def add(self, bound: float, user_id: int):
+        """Add a user's bound"""
+        index = bisect_right(self.bounds, bound)
+        self.bounds.insert(index, bound)
+        self.users.insert(index, user_id)
+
+    def remove(self, bound: float, user_id: int):
+        """Remove a user's bound"""
+        index = self.users.index(user_id, bisect_left(self.bounds, bound),
+                                 bisect_right(self.bounds, bound))
+        del self.bounds[index]
+        del self.users[index]
+
+    def above(self, value: float) -> List[int]:
+        """The users whose bound is greater than the value"""
+        return self.users[bisect_right(self.bounds, value):]
+
+    def below(self, value: float) -> List[int]:
+        """The users whose bound is less than the value"""
+        return self.users[:bisect_left(self.bounds, value)]
+
+
+class UserFilterIndex:
+    """In-memory index of the users receiving notifications, by their filters. Each
+       numeric bound is kept in a list sorted by the bound, so the users an expose value
+       falls outside of are found by bisection; excluded titles are indexed by pattern,
+       so each distinct pattern is matched once per expose. An expose matches the users
+       that none of the bounds or patterns reject. Unknown values reject nobody, like in
+       the filters"""
+
+    def __init__(self, user_settings=None):
+        self.users: Dict[int, Tuple] = {}
+        self.lower = [SortedBounds() for _ in range(4)]
+        self.upper = [SortedBounds() for _ in range(4)]
+        self.title_patterns: Dict[str, Tuple[re.Pattern, Set[int]]] = {}
+        for (user_id, settings) in user_settings or []:
+            self.update_user(user_id, settings)
+
+    def update_user(self, user_id: int, settings: Dict):
+        """Index a user's current settings, replacing any earlier ones. Muted users are
+           removed from the index"""
+        self.remove_user(user_id)
+        if settings is None or 'mute_notifications' in settings:
+            return
+        (lower, upper, titles) = user_bounds(settings)
+        self.users[user_id] = (lower, upper, titles)
+        for (dimension, bound) in enumerate(lower):
+            if bound != -INFINITY:
+                self.lower[dimension].add(bound, user_id)
+        for (dimension, bound) in enumerate(upper):
+            if bound != INFINITY:
+                self.upper[dimension].add(bound, user_id)
+        for title in titles:
+            if title not in self.title_patterns:
+                self.title_patterns[title] = (re.compile(title, re.IGNORECASE), set())
+            self.title_patterns[title][1].add(user_id)
+
+    def remove_user(self, user_id: int):
+        """Remove a user from the index"""
+        if user_id not in self.users:
+            return
+        (lower, upper, titles) = self.users.pop(user_id)
+        for (dimension, bound) in enumerate(lower):
+            if bound != -INFINITY:
+                self.lower[dimension].remove(bound, user_id)
+        for (dimension, bound) in enumerate(upper):
+            if bound != INFINITY:
+                self.upper[dimension].remove(bound, user_id)
+        for title in titles:
+            users = self.title_patterns[title][1]
+            users.discard(user_id)
+            if not users:
+                del self.title_patterns[title]
+
+    def matching_users(self, expose) -> Set[int]:
+        """The users whose filters the expose passes"""
+        rejected = set()
+        for (dimension, value) in enumerate(expose_values(expose)):
+            if math.isnan(value):
+                continue
+            rejected.update(self.lower[dimension].above(value))
+            rejected.update(self.upper[dimension].below(value))
+        for (pattern, users) in self.title_patterns.values():
+            if not users <= rejected and pattern.search(expose['title']):
+                rejected.update(users)
+        return self.users.keys() - rejected
+
+    def match(self, exposes) -> Dict[int, List[Dict]]:
+        """The exposes matching each indexed user's filters"""
+        matches = {user_id: [] for user_id in self.users}
+        for expose in exposes:
+            for user_id in self.matching_users(expose):
+                matches[user_id].append(expose)
+        return matches
@@ -15,5 +15,6 @@ def stats_view():
             map(lambda e: {'price': sanitize_float(e['price']),
                            'size': sanitize_float(e['size']),
                            'created_at': str(e['created_at'])},
-                hunter.get_exposes_since(datetime.datetime.now() - datetime.timedelta(days=28)))))
+                hunter.get_exposes_since(datetime.datetime.now() - datetime.timedelta(days=28),
+                                         fields=['price', 'size']))))
     return render_template("statistics.html", title="Statistics", exposes=exposes)
@@ -98,8 +98,10 @@ def index():
     domain = app.config.get("DOMAIN", None)
     filter_set = filter_for_user()
     form_values = form_filter_values()
+    (exposes, next_cursor) = hunter.get_recent_exposes_page(
+        filter_set=filter_set, cursor=request.args.get('before'))
     return render_template("index.html",
-                           title="Home", exposes=hunter.get_recent_exposes(filter_set=filter_set),
+                           title="Home", exposes=exposes, next_cursor=next_cursor,
                            last_run=hunter.get_last_run_time(), bot_name=bot_name, domain=domain,
                            login_url=generate_dummy_login_url(),
                            filters=form_values,
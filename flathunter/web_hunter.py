@@ -1,16 +1,42 @@
 """Flathunter implementation for website"""
-from flathunter.config import YamlConfig
 from flathunter.logging import logger
 from flathunter.hunter import Hunter
 from flathunter.filter import Filter
 from flathunter.processor import ProcessorChain
 from flathunter.exceptions import BotBlockedException, UserDeactivatedException
+from flathunter.user_filters import UserFilterMatrix
+from flathunter.user_index import UserFilterIndex
 
 class WebHunter(Hunter):
     """Flathunter implementation for website. Designed to hunt all exposes from
        all sites and save them to the database. Includes support for multiple users
        with individual filters implemented in-app"""
 
+    def __init__(self, config, id_watch):
+        super().__init__(config, id_watch)
+        self.user_index = None
+
+    def load_user_index(self):
+        """Build the index of users by their filters from the database. Other website
+           workers or instances may have changed the settings, so the index is rebuilt
+           for every hunt"""
+        self.user_index = UserFilterIndex(self.id_watch.get_user_settings())
+        return self.user_index
+
+    def save_settings_for_user(self, user_id, settings):
+        """Save a user's settings, and update the user index of the current hunt"""
+        self.id_watch.save_settings_for_user(user_id, settings)
+        if self.user_index is not None:
+            self.user_index.update_user(user_id, settings)
+
+    def match_users(self, exposes):
+        """The exposes matching the filters of each user receiving notifications"""
+        if self.config.user_matching() == 'matrix':
+            return UserFilterMatrix([(user_id, settings) for (user_id, settings)
+                                     in self.id_watch.get_user_settings()
+                                     if 'mute_notifications' not in settings]).match(exposes)
+        return self.load_user_index().match(exposes)
+
     def hunt_flats(self, max_pages=1):
         """Crawl all URLs, and send notifications to users of new flats"""
         filter_set = Filter.builder() \
@@ -31,28 +57,25 @@ class WebHunter(Hunter):
         for expose in processor_chain.process(self.crawl_for_exposes(max_pages=max_pages)):
             new_exposes.append(expose)
 
-        for (user_id, settings) in self.id_watch.get_user_settings():
-            if 'mute_notifications' in settings:
+        for (user_id, matches) in self.match_users(new_exposes).items():
+            if not matches:
                 continue
-            filter_set = Filter.builder().read_config(YamlConfig(settings)).build()
             try:
                 processor_chain = ProcessorChain.builder(self.config) \
-                                                .apply_filter(filter_set) \
                                                 .send_messages([user_id]) \
                                                 .build()
-                for message in processor_chain.process(new_exposes):
+                for message in processor_chain.process(matches):
                     logger.debug("Sent expose %d to user %d", message['id'], user_id)
             except BotBlockedException:
                 logger.warning("Bot has been blocked by user %d - updating settings", user_id)
-                settings["mute_notifications"] = True
-                self.id_watch.save_settings_for_user(user_id, settings)
+                self.set_notification_status(user_id, False)
             except UserDeactivatedException:
                 logger.warning(
                     "User %d has deactivated their telegram account - updating settings", user_id)
-                settings["mute_notifications"] = True
-                self.id_watch.save_settings_for_user(user_id, settings)
+                self.set_notification_status(user_id, False)
 
         self.id_watch.update_last_run_time()
+        self.id_watch.prune()
         return list(new_exposes)
 
     def get_last_run_time(self):
@@ -63,9 +86,15 @@ class WebHunter(Hunter):
         """Load the most recent exposes matching the current filter"""
         return self.id_watch.get_recent_exposes(count, filter_set=filter_set)
 
-    def get_exposes_since(self, min_datetime):
-        """Return exposes since the provided datetime"""
-        return self.id_watch.get_exposes_since(min_datetime)
+    def get_recent_exposes_page(self, count=9, filter_set=None, cursor=None):
+        """Load a page of recent exposes matching the current filter, older than the
+           cursor. Returns the exposes and the cursor of the following page"""
+        return self.id_watch.get_recent_exposes_page(count, filter_set=filter_set,
+                                                     cursor=cursor)
+
+    def get_exposes_since(self, min_datetime, fields=None):
+        """Return exposes since the provided datetime, optionally only the given fields"""
+        return self.id_watch.get_exposes_since(min_datetime, fields=fields)
 
     def set_filters_for_user(self, user_id, filters):
         """Set the filters for a given user"""
@@ -73,7 +102,7 @@ class WebHunter(Hunter):
         if settings is None:
             settings = {}
         settings['filters'] = filters
-        self.id_watch.save_settings_for_user(user_id, settings)
+        self.save_settings_for_user(user_id, settings)
 
     def get_filters_for_user(self, user_id):
         """Return the filters for a given user"""
@@ -95,7 +124,7 @@ class WebHunter(Hunter):
             del settings['mute_notifications']
         if 'mute_notifications' not in settings and not receives_notifications:
             settings['mute_notifications'] = True
-        self.id_watch.save_settings_for_user(user_id, settings)
+        self.save_settings_for_user(user_id, settings)
 
     def toggle_notification_status(self, user_id):
         """Toggle notification status for the given user"""
@@ -1,9 +1,9 @@
 """ Startup file for Google Cloud deployment or local webserver"""
+import atexit
 import os
 
 from flathunter.argument_parser import parse
-from database.idmaintainer import IdMaintainer
-from database.googlecloud_idmaintainer import GoogleCloudIdMaintainer
+from database.backends import create_storage
 from flathunter.web_hunter import WebHunter
 from flathunter.config import Config
 from flathunter.logging import configure_logging
@@ -20,12 +20,12 @@ else:
 
 if __name__ == '__main__':
     # Use the SQLite DB file if we are running locally
-    id_watch = IdMaintainer(f'{config.database_location()}/processed_ids.db')
+    id_watch = create_storage(config, 'sqlite')
 else:
     # Load the driver manager from local cache (if chrome_driver_install.py has been run
     os.environ['WDM_LOCAL'] = '1'
     # Use Google Cloud DB if we run on the cloud
-    id_watch = GoogleCloudIdMaintainer(config)
+    id_watch = create_storage(config, 'firestore')
 
 configure_logging(config)
 
@@ -33,6 +33,7 @@ configure_logging(config)
 config.init_searchers()
 
 hunter = WebHunter(config, id_watch)
+atexit.register(hunter.close)
 
 app.config["HUNTER"] = hunter
 if config.has_website_config():
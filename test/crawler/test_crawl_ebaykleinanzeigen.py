@@ -1,3 +1,7 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+import time
+
 import pytest
 
 from flathunter.crawler.kleinanzeigen import Kleinanzeigen
@@ -36,3 +40,22 @@ def test_process_expose_fetches_details(crawler):
         print(expose)
         for attr in [ 'title', 'price', 'size', 'rooms', 'address', 'from' ]:
             assert expose[attr]
+
+def test_driver_is_created_once_and_used_under_lock(crawler, mocker):
+    def slow_driver(arguments):
+        time.sleep(0.05)
+        return mocker.Mock(page_source='<html></html>')
+    create_driver = mocker.patch('flathunter.crawler.kleinanzeigen.get_chrome_driver',
+                                 side_effect=slow_driver)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        drivers = list(executor.map(lambda _: crawler.get_driver(), range(4)))
+    assert create_driver.call_count == 1
+    assert all(driver is drivers[0] for driver in drivers)
+    held = []
+    def check_lock(url):
+        probe = Thread(target=lambda: held.append(not crawler.driver_lock.acquire(blocking=False)))
+        probe.start()
+        probe.join()
+    drivers[0].get.side_effect = check_lock
+    crawler.get_page_content(TEST_URL)
+    assert held == [True]
@@ -6,7 +6,7 @@ import re
 
 from flathunter.crawler.immobilienscout import Immobilienscout
 from flathunter.captcha.captcha_solver import CaptchaBalanceEmpty
-from test.utils.config import StringConfigWithCaptchas
+from test.utils.config import StringConfig, StringConfigWithCaptchas
 
 DUMMY_CONFIG = """
 urls:
@@ -66,3 +66,73 @@ def test_captcha_error_no_balance(crawler):
         m.get('http://2captcha.com/res.php', text='ERROR_ZERO_BALANCE')
         with pytest.raises(CaptchaBalanceEmpty):
             assert crawler.get_page(TEST_URL, crawler.get_driver(), page_no=1)
+
+def paged_results(page_no, per_page=10):
+    return [{'id': (page_no - 1) * per_page + idx} for idx in range(1, per_page + 1)]
+
+@pytest.fixture
+def paging_crawler(mocker):
+    crawler = Immobilienscout(StringConfig(string=DUMMY_CONFIG))
+    loaded = []
+    def get_page_content(search_url, driver=None, page_no=None):
+        loaded.append(page_no)
+        return f'<span data-is24-qa="resultlist-resultCount">100</span><!--{page_no}-->'
+    mocker.patch.object(crawler, 'get_page_content', side_effect=get_page_content)
+    mocker.patch.object(crawler, '_extract_data_from_content',
+                        side_effect=lambda content: paged_results(int(content[-4])))
+    return (crawler, loaded)
+
+def test_crawl_loads_only_first_page(paging_crawler):
+    (crawler, loaded) = paging_crawler
+    entries = crawler.get_results(TEST_URL)
+    assert loaded == [1]
+    assert [entry['id'] for entry in entries] == list(range(1, 11))
+
+def test_incremental_crawl_loads_pages_up_to_result_limit(paging_crawler):
+    (crawler, loaded) = paging_crawler
+    entries = crawler.get_results(TEST_URL, seen=lambda ids: set())
+    assert loaded == [1, 2, 3, 4, 5]
+    assert [entry['id'] for entry in entries] == list(range(1, 51))
+    assert len(crawler.get_results(TEST_URL, max_pages=2, seen=lambda ids: set())) == 20
+
+def test_incremental_crawl_stops_at_known_page(paging_crawler):
+    (crawler, loaded) = paging_crawler
+    known = set(range(11, 100))
+    entries = crawler.get_results(TEST_URL, seen=lambda ids: known.intersection(ids))
+    assert loaded == [1, 2]
+    assert len(entries) == 20
+
+def test_incremental_crawl_pages_with_selenium(mocker):
+    crawler = Immobilienscout(StringConfig(string=DUMMY_CONFIG))
+    loaded = []
+    mocker.patch.object(crawler, 'get_driver', return_value=mocker.Mock())
+    mocker.patch.object(crawler, 'get_page_content',
+                        side_effect=lambda url, driver, page_no: loaded.append(page_no))
+    mocker.patch.object(crawler, 'get_entries_from_javascript',
+                        side_effect=lambda: (paged_results(loaded[-1]), 100))
+    known = set(range(21, 100))
+    entries = crawler.get_results(TEST_URL, seen=lambda ids: known.intersection(ids))
+    assert loaded == [1, 2, 3]
+    assert len(entries) == 30
+
+def test_crawl_loads_only_first_page_with_selenium(mocker):
+    crawler = Immobilienscout(StringConfig(string=DUMMY_CONFIG))
+    loaded = []
+    mocker.patch.object(crawler, 'get_driver', return_value=mocker.Mock())
+    mocker.patch.object(crawler, 'get_page_content',
+                        side_effect=lambda url, driver, page_no: loaded.append(page_no))
+    mocker.patch.object(crawler, 'get_entries_from_javascript',
+                        side_effect=lambda: (paged_results(loaded[-1]), 100))
+    assert len(crawler.get_results(TEST_URL)) == 10
+    assert loaded == [1]
+
+def test_result_count_is_read_from_javascript(mocker):
+    crawler = Immobilienscout(StringConfig(string=DUMMY_CONFIG))
+    with open(os.path.join(os.path.dirname(os.path.realpath(__file__)), "fixtures", "immo-scout-IS24-object.json")) as fixture:
+        data = json.load(fixture)
+    driver = mocker.Mock()
+    driver.execute_script.return_value = data['resultList']
+    mocker.patch.object(crawler, 'get_driver', return_value=driver)
+    (entries, count) = crawler.get_entries_from_javascript()
+    assert len(entries) > 0
+    assert count == 34
@@ -0,0 +1,35 @@
+import requests_mock
+from requests.adapters import HTTPAdapter
+
+from flathunter.crawler.vrmimmo import VrmImmo
+from test.utils.config import StringConfig
+
+DUMMY_CONFIG = """
+urls:
+  - https://vrm-immo.de/suchergebnisse?l=Darmstadt&r=0km&_multiselect_r=0km&a=de.darmstadt&t=apartment%3Arental&pf=&pt=&rf=0&rt=0&sf=&st=
+
+http:
+  pool_size: 4
+  max_retries: 1
+"""
+
+def test_session_is_reused():
+    crawler = VrmImmo(StringConfig(string=DUMMY_CONFIG))
+    session = crawler._get_session()
+    assert crawler._get_session() is session
+    adapter = session.get_adapter('https://vrm-immo.de/')
+    assert isinstance(adapter, HTTPAdapter)
+    assert adapter.max_retries.total == 1
+    assert adapter._pool_maxsize == 4
+
+def test_pages_are_fetched_with_session():
+    crawler = VrmImmo(StringConfig(string=DUMMY_CONFIG))
+    with requests_mock.Mocker() as m:
+        m.get('https://vrm-immo.de/suchergebnisse', text='<html><body><p>Hello</p></body></html>')
+        soup = crawler.get_soup_from_url('https://vrm-immo.de/suchergebnisse')
+        soup = crawler.get_soup_from_url('https://vrm-immo.de/suchergebnisse')
+    paragraph = soup.find('p')
+    assert paragraph is not None
+    assert paragraph.text == 'Hello'
+    assert m.call_count == 2
+    assert crawler.session is not None
@@ -87,3 +87,11 @@ filters:
        config = StringConfig(string=self.FILTERS_CONFIG)
        self.assertIsNotNone(config)
        self.assertEqual(config.database_location(), os.path.abspath(os.path.dirname(os.path.abspath(__file__)) + "/.."))
+
+    def test_crawler_lookup_by_url(self):
+       config = StringConfig(string=self.DUMMY_CONFIG)
+       config.init_searchers()
+       crawler = config.get_crawler_for_url(config.target_urls()[0])
+       self.assertEqual(crawler.get_name(), "Immowelt")
+       self.assertIs(config.get_crawler_for_url("https://www.immowelt.de/expose/12345"), crawler)
+       self.assertIsNone(config.get_crawler_for_url("https://www.example.com/search"))
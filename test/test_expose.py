@@ -0,0 +1,62 @@
+import pickle
+import sys
+
+import pytest
+
+from database.expose_codec import decode_expose, get_encoder
+from flathunter.expose import Expose
+from flathunter.filter import ExposeHelper, Filter, MaxPriceFilter
+from flathunter.hunter import Hunter
+from database.idmaintainer import IdMaintainer
+from test.dummy_crawler import DummyCrawler
+from test.utils.config import StringConfig
+
+DETAILS = {'id': 1, 'crawler': 'Immowelt', 'title': 'Schöne Wohnung', 'url': 'https://x',
+           'price': '1.150 €', 'size': '62,5 m²', 'rooms': '2', 'address': 'Berlin',
+           'from': '01.05.2024'}
+
+def test_expose_behaves_like_dict():
+    expose = Expose(DETAILS)
+    assert expose == DETAILS
+    assert dict(expose) == DETAILS
+    assert expose['from'] == '01.05.2024'
+    assert expose.get('images') is None
+    assert 'image' not in expose
+    expose['durations'] = '10 min'
+    del expose['address']
+    assert set(expose) == set(DETAILS) - {'address'} | {'durations'}
+    with pytest.raises(KeyError):
+        expose['address']
+    assert '{title}: {price}'.format(**expose) == 'Schöne Wohnung: 1.150 €'
+
+def test_numbers_are_parsed_when_set():
+    expose = Expose(DETAILS)
+    assert (expose.price_value, expose.size_value, expose.rooms_value) == (1150.0, 62.5, 2.0)
+    expose['price'] = 'auf Anfrage'
+    assert expose.price_value is None
+    expose['rooms'] = 3
+    assert expose.rooms_value is None
+
+def test_filters_use_parsed_numbers(mocker):
+    expose = Expose(DETAILS)
+    spy = mocker.spy(Expose, '__getitem__')
+    assert ExposeHelper.get_price(expose) == 1150.0
+    assert not Filter([MaxPriceFilter(1000)]).is_interesting_expose(expose)
+    assert spy.call_count == 0
+
+def test_expose_is_smaller_than_dict():
+    details = {key: value for (key, value) in DETAILS.items() if key != 'from'}
+    assert sys.getsizeof(Expose(details)) < sys.getsizeof(details)
+
+def test_expose_is_serialised_as_dict():
+    expose = Expose(DETAILS)
+    for codec in ['json', 'zlib', 'msgpack']:
+        assert decode_expose(get_encoder(codec)(expose)) == DETAILS
+    assert pickle.loads(pickle.dumps(expose)) == expose
+
+def test_crawled_exposes_are_records():
+    config = StringConfig(string="urls:\n  - https://www.example.com/search\n")
+    config.set_searchers([DummyCrawler()])
+    exposes = Hunter(config, IdMaintainer(":memory:")).hunt_flats()
+    assert len(exposes) > 0
+    assert all(isinstance(expose, Expose) for expose in exposes)
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from database.expose_codec import decode_expose, encode_msgpack, get_encoder, ZLIB_JSON, MSGPACK
+from database.idmaintainer import IdMaintainer
+from database.maintenance import convert_exposes
+from flathunter.config import YamlConfig
+from flathunter.exceptions import ConfigException
+
+EXPOSE = {'id': 1, 'crawler': 'Immowelt', 'title': 'Schöne Wohnung', 'price': '900 EUR',
+          'size': '45 m²', 'rooms': '2', 'images': ['https://example.com/1.jpg']}
+
+def test_exposes_round_trip():
+    for codec in ['json', 'zlib', 'msgpack']:
+        assert decode_expose(get_encoder(codec)(EXPOSE)) == EXPOSE
+    assert get_encoder('zlib')(EXPOSE)[0] == ZLIB_JSON
+    assert get_encoder('msgpack')(EXPOSE)[0] == MSGPACK
+
+def test_legacy_json_is_readable():
+    assert decode_expose(json.dumps(EXPOSE)) == EXPOSE
+    assert decode_expose(json.dumps(EXPOSE).encode('utf-8')) == EXPOSE
+
+def test_invalid_codec_is_rejected():
+    with pytest.raises(ConfigException):
+        get_encoder('pickle')
+
+def test_database_is_converted():
+    config = YamlConfig({'sqlite': {'expose_codec': 'json'}})
+    id_watch = IdMaintainer(":memory:", config)
+    id_watch.save_exposes([dict(EXPOSE, id=expose_id) for expose_id in range(5)])
+    id_watch.encode_expose = get_encoder('zlib')
+    id_watch.save_exposes([dict(EXPOSE, id=expose_id) for expose_id in range(5, 10)])
+    assert len(id_watch.get_recent_exposes(20)) == 10
+    assert convert_exposes(id_watch, 'msgpack') == 10
+    rows = id_watch.get_connection().execute('SELECT details FROM exposes').fetchall()
+    assert all(details[0] == MSGPACK for (details,) in rows)
+    assert sorted(expose['id'] for expose in id_watch.get_recent_exposes(20)) == list(range(10))
+
+def test_msgpack_codec_needs_msgpack(monkeypatch):
+    monkeypatch.setattr('database.expose_codec.msgpack', None)
+    with pytest.raises(ConfigException):
+        get_encoder('msgpack')
+    with pytest.raises(ConfigException):
+        encode_msgpack(EXPOSE)
@@ -0,0 +1,55 @@
+from flathunter.filter import AbstractFilter, ExposeHelper, Filter, MaxPriceFilter, \
+    MinPriceFilter, PPSFilter, TitleFilter
+from database.idmaintainer import IdMaintainer
+from test.utils.config import StringConfig
+
+class RecordingFilter(AbstractFilter):
+
+    def __init__(self):
+        self.seen = []
+
+    def is_interesting(self, expose):
+        self.seen.append(expose['id'])
+        return True
+
+def make_expose(expose_id, price):
+    return {'id': expose_id, 'crawler': 'Immowelt', 'title': 'Schöne Wohnung',
+            'price': f'{price} EUR', 'size': '50 m²', 'rooms': '2'}
+
+def test_filters_stop_at_first_rejection():
+    recorder = RecordingFilter()
+    filter_set = Filter([recorder, MaxPriceFilter(1000)])
+    assert filter_set.predicates[0].__class__ == MaxPriceFilter
+    assert not filter_set.is_interesting_expose(make_expose(1, 1500))
+    assert filter_set.is_interesting_expose(make_expose(2, 900))
+    assert recorder.seen == [2]
+
+def test_price_is_parsed_once(mocker):
+    spy = mocker.spy(ExposeHelper, 'get_price')
+    filter_set = Filter([MinPriceFilter(500), MaxPriceFilter(1000), PPSFilter(30)])
+    assert filter_set.is_interesting_expose(make_expose(1, 900))
+    assert spy.call_count == 1
+
+def test_price_is_parsed_once_per_expose_in_batch(mocker):
+    spy = mocker.spy(ExposeHelper, 'get_price')
+    filter_set = Filter([MinPriceFilter(500), MaxPriceFilter(1000), PPSFilter(30)])
+    assert filter_set.filter_batch([make_expose(1, 900), make_expose(2, 800)]) == \
+        [make_expose(1, 900), make_expose(2, 800)]
+    assert spy.call_count == 2
+
+def test_title_filter_is_compiled_once():
+    title_filter = TitleFilter(['tausch', 'wg'])
+    assert title_filter.pattern.pattern == '(tausch)|(wg)'
+    assert not title_filter.is_interesting({'title': 'WG-Zimmer frei'})
+    assert title_filter.is_interesting({'title': 'Schöne Wohnung'})
+
+def test_rejected_exposes_are_marked_as_seen():
+    id_watch = IdMaintainer(":memory:")
+    config = StringConfig(string="filters:\n  max_price: 1000\n")
+    filter_set = Filter.builder().read_config(config).filter_already_seen(id_watch).build()
+    assert filter_set.stateful_filters == filter_set.filters[-1:]
+    assert not filter_set.is_interesting_expose(make_expose(1, 1500))
+    assert filter_set.filter_batch([make_expose(2, 1500), make_expose(3, 900)]) == \
+        [make_expose(3, 900)]
+    assert id_watch.is_processed_many([1, 2, 3], 'Immowelt') == {1, 2, 3}
+    assert not filter_set.is_interesting_expose(make_expose(3, 900))
@@ -3,8 +3,10 @@ import datetime
 import re
 from typing import Dict
 from mockfirestore import MockFirestore
+from mockfirestore.query import Query
 
 from database.googlecloud_idmaintainer import GoogleCloudIdMaintainer
+from database.seen_cache import SeenIdCache
 from flathunter.hunter import Hunter
 from flathunter.web_hunter import WebHunter
 from flathunter.filter import Filter
@@ -12,10 +14,29 @@ from test.dummy_crawler import DummyCrawler
 from test.test_util import count
 from test.utils.config import StringConfig
 
+class MockWriteBatch:
+
+    def __init__(self):
+        self.writes = []
+
+    def set(self, reference, data):
+        self.writes.append((reference, data))
+
+    def commit(self):
+        for (reference, data) in self.writes:
+            reference.set(data)
+        self.writes = []
+
+class MockFirestoreWithBatches(MockFirestore):
+
+    def batch(self):
+        return MockWriteBatch()
+
 class MockGoogleCloudIdMaintainer(GoogleCloudIdMaintainer):
 
     def __init__(self):
-        self.database = MockFirestore()
+        self.database = MockFirestoreWithBatches()
+        self.seen_cache = SeenIdCache(None)
 
 CONFIG_WITH_FILTERS = """
 urls:
@@ -33,6 +54,46 @@ def test_read_after_write(id_watch):
     id_watch.mark_processed(12345)
     assert id_watch.is_processed(12345)
 
+def test_processed_ids_are_checked_in_bulk(id_watch):
+    id_watch.mark_processed_many([1, 2, 3])
+    assert id_watch.is_processed(2)
+    assert id_watch.is_processed_many([2, 3, 4, 5]) == {2, 3}
+    assert id_watch.is_processed_many([]) == set()
+
+def test_seen_ids_are_served_from_cache(id_watch, mocker):
+    id_watch.database.collection('processed').document('7').set({'id': 7})
+    id_watch.mark_processed(12345)
+    spy = mocker.spy(id_watch.database, "get_all")
+    assert id_watch.is_processed_many([7, 12345]) == {7, 12345}
+    assert spy.call_count == 1
+    assert id_watch.is_processed_many([7, 12345]) == {7, 12345}
+    assert spy.call_count == 1
+    assert id_watch.is_processed_many([7, 8]) == {7}
+    assert spy.call_count == 2
+
+def test_processed_ids_are_read_in_parallel_chunks(id_watch, mocker):
+    id_watch.mark_processed_many(range(0, 500, 2))
+    id_watch.seen_cache = SeenIdCache(None)
+    spy = mocker.spy(id_watch.database, "get_all")
+    assert id_watch.is_processed_many(range(250)) == set(range(0, 250, 2))
+    assert spy.call_count == 3
+    assert max(len(call.args[0]) for call in spy.call_args_list) == 100
+
+def test_exposes_are_saved_in_write_batches(id_watch, mocker):
+    spy = mocker.spy(id_watch.database, "batch")
+    id_watch.save_exposes([{'id': expose_id, 'crawler': 'Immowelt', 'title': 'Flat'}
+                           for expose_id in range(501)])
+    assert spy.call_count == 2
+    assert len(list(id_watch.database.collection('exposes').stream())) == 501
+
+def test_recent_exposes_are_paged_with_cursor(id_watch):
+    id_watch.save_exposes([{'id': expose_id, 'crawler': 'Immowelt'} for expose_id in range(7)])
+    (page, cursor) = id_watch.get_recent_exposes_page(4)
+    assert len(page) == 4
+    (next_page, cursor) = id_watch.get_recent_exposes_page(4, cursor=cursor)
+    assert cursor is None
+    assert sorted(expose['id'] for expose in page + next_page) == list(range(7))
+
 def test_get_last_run_time_none_by_default(id_watch):
     assert id_watch.get_last_run_time() == None
 
@@ -60,6 +121,18 @@ def test_exposes_are_saved_to_maintainer(id_watch):
     assert len(saved) > 0
     assert count(exposes) < len(saved)
 
+def test_exposes_since_are_queried_by_time_range(id_watch, mocker):
+    mocker.patch.object(GoogleCloudIdMaintainer, 'QUERY_PAGE_SIZE', 3)
+    old = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+    id_watch.database.collection('exposes').document('1').set({'id': 1, 'created_at': old,
+                                                                'created_sort': 0})
+    id_watch.save_exposes([{'id': expose_id, 'crawler': 'Immowelt'}
+                           for expose_id in range(2, 9)])
+    spy = mocker.spy(Query, 'stream')
+    saved = id_watch.get_exposes_since(datetime.datetime.now() - datetime.timedelta(seconds=10))
+    assert sorted(expose['id'] for expose in saved) == list(range(2, 9))
+    assert spy.call_count == 3
+
 def test_exposes_are_returned_as_dictionaries(id_watch):
     config = StringConfig(string=CONFIG_WITH_FILTERS)
     config.set_searchers([DummyCrawler()])
@@ -1,5 +1,7 @@
 import unittest
+from unittest.mock import patch
 import re
+import requests
 from typing import Optional, Dict, List
 from flathunter.crawler.immowelt import Immowelt
 from flathunter.hunter import Hunter 
@@ -227,3 +229,46 @@ excluded_titles:
             for expose in unfiltered:
                 print("Got unfiltered expose: ", expose)
         self.assertTrue(len(unfiltered) == 0, "Expected flats with too few rooms to be filtered")
+
+    MULTIPLE_URLS_CONFIG = """
+urls:
+  - https://www.example.com/search/flats-in-berlin
+  - https://www.example.com/search/flats-in-hamburg
+  - https://www.example.com/search/flats-in-munich
+
+crawl:
+  max_workers: 3
+  max_workers_per_host: 2
+"""
+
+    def test_crawl_multiple_urls_in_parallel(self):
+        config = StringConfig(string=self.MULTIPLE_URLS_CONFIG)
+        crawler = DummyCrawler()
+        config.set_searchers([crawler])
+        hunter = Hunter(config, IdMaintainer(":memory:"))
+        exposes = list(hunter.crawl_for_exposes())
+        self.assertTrue(count(exposes) >= 60, "Expected to find exposes from all URLs")
+
+    def test_crawl_errors_are_ignored(self):
+        config = StringConfig(string=self.MULTIPLE_URLS_CONFIG)
+        config.set_searchers([FailingCrawler()])
+        hunter = Hunter(config, IdMaintainer(":memory:"))
+        self.assertEqual(list(hunter.crawl_for_exposes()), [])
+
+    def test_incremental_crawl_passes_processed_ids(self):
+        config = StringConfig(string="urls:\n  - https://www.example.com/search\n"
+                                     "crawl:\n  incremental: true\n")
+        crawler = DummyCrawler()
+        config.set_searchers([crawler])
+        id_watch = IdMaintainer(":memory:")
+        id_watch.mark_processed(7, crawler.get_name())
+        with patch.object(crawler, 'get_results', return_value=[]) as get_results:
+            list(Hunter(config, id_watch).crawl_for_exposes())
+        seen = get_results.call_args.args[2]
+        self.assertEqual(seen([6, 7]), {7})
+
+
+class FailingCrawler(DummyCrawler):
+
+    def get_results(self, search_url, max_pages=None, seen=None):
+        raise requests.exceptions.ConnectionError("Connection refused")
@@ -1,9 +1,16 @@
 import unittest
 import datetime
+import os
 import re
+import sqlite3
+import tempfile
+import pytest
 from typing import Dict
 
-from database.idmaintainer import IdMaintainer
+from database.buffered_writer import BufferedExposeWriter
+from database.idmaintainer import IdMaintainer, MIGRATIONS
+from database.maintenance import compact
+from flathunter.exceptions import ConfigException
 from flathunter.hunter import Hunter
 from flathunter.web_hunter import WebHunter
 from flathunter.filter import Filter
@@ -43,6 +50,37 @@ filters:
         self.assertIsNotNone(time, "Expected time not to be none")
         self.assertEqual(time, self.maintainer.get_last_run_time(), "Expected last run time to be updated")
 
+def test_processed_ids_are_keyed_by_crawler():
+    id_watch = IdMaintainer(":memory:")
+    id_watch.mark_processed(12345, 'Immowelt')
+    assert id_watch.is_processed(12345, 'Immowelt')
+    assert id_watch.is_processed(12345)
+    assert not id_watch.is_processed(12345, 'WgGesucht')
+
+def test_processed_id_lookup_uses_primary_key():
+    connection = IdMaintainer(":memory:").get_connection()
+    plan = connection.execute("EXPLAIN QUERY PLAN SELECT 1 FROM processed "
+                              "WHERE id = ? AND crawler IN (?, '')", (1, 'Immowelt')).fetchall()
+    details = ' '.join(row[-1] for row in plan)
+    assert 'PRIMARY KEY' in details
+    assert 'SCAN' not in details
+
+def test_legacy_processed_table_is_migrated():
+    with tempfile.TemporaryDirectory() as database_dir:
+        db_name = os.path.join(database_dir, 'processed_ids.db')
+        legacy = sqlite3.connect(db_name)
+        legacy.execute('CREATE TABLE processed (ID INTEGER)')
+        legacy.executemany('INSERT INTO processed VALUES(?)', [(1,), (2,), (2,)])
+        legacy.commit()
+        legacy.close()
+        id_watch = IdMaintainer(db_name)
+        assert id_watch.is_processed(1, 'Immowelt')
+        assert id_watch.is_processed(2)
+        assert not id_watch.is_processed(3)
+        connection = id_watch.get_connection()
+        assert connection.execute('PRAGMA user_version').fetchone()[0] == len(MIGRATIONS)
+        assert connection.execute('SELECT COUNT(*) FROM processed').fetchone()[0] == 2
+
 def test_is_processed_works(mocker):
     config = StringConfig(string=IdMaintainerTest.DUMMY_CONFIG)
     config.set_searchers([DummyCrawler()])
@@ -57,11 +95,28 @@ def test_ids_are_added_to_maintainer(mocker):
     config = StringConfig(string=IdMaintainerTest.DUMMY_CONFIG)
     config.set_searchers([DummyCrawler()])
     id_watch = IdMaintainer(":memory:")
-    spy = mocker.spy(id_watch, "mark_processed")
+    spy = mocker.spy(id_watch, "mark_processed_many")
     hunter = Hunter(config, id_watch)
     exposes = hunter.hunt_flats()
     assert count(exposes) > 4
-    assert spy.call_count == 24
+    assert sum(len(call.args[0]) for call in spy.call_args_list) == 24
+
+def test_processed_ids_are_checked_in_bulk():
+    id_watch = IdMaintainer(":memory:")
+    id_watch.mark_processed_many([1, 2, 3], 'Immowelt')
+    id_watch.mark_processed(4)
+    assert id_watch.is_processed_many(range(1000), 'Immowelt') == {1, 2, 3, 4}
+    assert id_watch.is_processed_many([1, 4, 5], 'WgGesucht') == {4}
+    assert id_watch.is_processed_many([1, 5]) == {1}
+
+def test_already_seen_filter_in_batches():
+    id_watch = IdMaintainer(":memory:")
+    id_watch.mark_processed(1, 'Immowelt')
+    exposes = [{'id': 1, 'crawler': 'Immowelt'}, {'id': 2, 'crawler': 'Immowelt'},
+               {'id': 2, 'crawler': 'Immowelt'}, {'id': 1, 'crawler': 'WgGesucht'}]
+    filter_set = Filter.builder().filter_already_seen(id_watch).build()
+    assert filter_set.filter_batch(exposes) == [exposes[1], exposes[3]]
+    assert filter_set.filter_batch(exposes) == []
 
 def test_exposes_are_saved_to_maintainer():
     config = StringConfig(string=IdMaintainerTest.CONFIG_WITH_FILTERS)
@@ -74,6 +129,44 @@ def test_exposes_are_saved_to_maintainer():
     assert len(saved) > 0
     assert count(exposes) < len(saved)
 
+def test_exposes_are_saved_in_batches(mocker):
+    config = StringConfig(string=IdMaintainerTest.CONFIG_WITH_FILTERS + "\nbatch:\n  size: 10\n")
+    config.set_searchers([DummyCrawler()])
+    id_watch = IdMaintainer(":memory:")
+    spy = mocker.spy(id_watch, "save_exposes")
+    hunter = Hunter(config, id_watch)
+    exposes = hunter.hunt_flats()
+    assert count(exposes) > 4
+    saved = id_watch.get_exposes_since(datetime.datetime.now() - datetime.timedelta(seconds=10))
+    assert sum(len(call.args[0]) for call in spy.call_args_list) == len(saved)
+
+def test_saves_are_buffered_until_the_end_of_the_hunt(mocker):
+    config = StringConfig(string=IdMaintainerTest.CONFIG_WITH_FILTERS + """
+save:
+  batch_size: 1000
+  flush_interval: 600
+""")
+    config.set_searchers([DummyCrawler()])
+    id_watch = IdMaintainer(":memory:")
+    spy = mocker.spy(id_watch, "save_exposes")
+    Hunter(config, id_watch).hunt_flats()
+    assert spy.call_count == 1
+    saved = id_watch.get_exposes_since(datetime.datetime.now() - datetime.timedelta(seconds=10))
+    assert len(spy.call_args.args[0]) == len(saved)
+
+def test_buffered_writer_flushes_on_batch_size_and_interval(mocker):
+    id_watch = IdMaintainer(":memory:")
+    spy = mocker.spy(id_watch, "save_exposes")
+    writer = BufferedExposeWriter(id_watch, batch_size=3, flush_interval=None)
+    for expose_id in range(7):
+        writer.save({'id': expose_id, 'crawler': 'Immowelt'})
+    assert [len(call.args[0]) for call in spy.call_args_list] == [3, 3]
+    writer.flush()
+    assert [len(call.args[0]) for call in spy.call_args_list] == [3, 3, 1]
+    writer = BufferedExposeWriter(id_watch, batch_size=100, flush_interval=0)
+    writer.save({'id': 8, 'crawler': 'Immowelt'})
+    assert spy.call_count == 4
+
 def test_exposes_are_returned_as_dictionaries():
     config = StringConfig(string=IdMaintainerTest.CONFIG_WITH_FILTERS)
     config.set_searchers([DummyCrawler()])
@@ -133,3 +226,109 @@ def test_all_filters_can_be_loaded():
     hunter.set_filters_for_user(123, filter)
     hunter.set_filters_for_user(124, filter)
     assert id_watch.get_user_settings() == [ (123, { 'filters': filter }), (124, { 'filters': filter }) ]
+
+def test_connection_pragmas_are_configured():
+    config = StringConfig(string="sqlite:\n  cache_size: 4096\n  mmap_size: 0\n")
+    with tempfile.TemporaryDirectory() as database_dir:
+        id_watch = IdMaintainer(os.path.join(database_dir, 'processed_ids.db'), config)
+        connection = id_watch.get_connection()
+        assert connection.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert connection.execute('PRAGMA synchronous').fetchone()[0] == 1
+        assert connection.execute('PRAGMA cache_size').fetchone()[0] == -4096
+        assert connection.execute('PRAGMA mmap_size').fetchone()[0] == 0
+
+def test_invalid_journal_mode_is_rejected():
+    id_watch = IdMaintainer(":memory:", StringConfig(string="sqlite:\n  journal_mode: fast\n"))
+    with pytest.raises(ConfigException):
+        id_watch.get_connection()
+
+def test_readers_are_not_blocked_by_writer():
+    with tempfile.TemporaryDirectory() as database_dir:
+        db_name = os.path.join(database_dir, 'processed_ids.db')
+        writer = IdMaintainer(db_name)
+        writer.save_expose({'id': 1, 'crawler': 'Immowelt', 'title': 'Flat'})
+        connection = writer.get_connection()
+        connection.execute('BEGIN IMMEDIATE')
+        connection.execute("INSERT INTO processed (id, crawler) VALUES (2, 'Immowelt')")
+        reader = IdMaintainer(db_name, StringConfig(string="sqlite:\n  busy_timeout: 0\n"))
+        assert len(reader.get_recent_exposes(10)) == 1
+        connection.commit()
+
+def test_recent_exposes_are_paged_with_cursor():
+    id_watch = IdMaintainer(":memory:")
+    for batch in range(3):
+        id_watch.save_exposes([{'id': batch * 10 + idx, 'crawler': 'Immowelt', 'size': '50'}
+                               for idx in range(10)])
+    (page, cursor) = id_watch.get_recent_exposes_page(12)
+    assert [expose['id'] for expose in page] == list(range(29, 17, -1))
+    ids = [expose['id'] for expose in page]
+    while cursor is not None:
+        (page, cursor) = id_watch.get_recent_exposes_page(12, cursor=cursor)
+        ids += [expose['id'] for expose in page]
+    assert ids == list(range(29, -1, -1))
+    (page, _) = id_watch.get_recent_exposes_page(5, cursor='not a cursor')
+    assert page == id_watch.get_recent_exposes(5)
+
+def test_recent_exposes_use_created_index():
+    connection = IdMaintainer(":memory:").get_connection()
+    plan = connection.execute("EXPLAIN QUERY PLAN SELECT details FROM exposes "
+                              "WHERE (created, id, crawler) < (?, ?, ?) "
+                              "ORDER BY created DESC, id DESC, crawler DESC LIMIT 10",
+                              ('2024-01-01', 1, 'Immowelt')).fetchall()
+    details = ' '.join(row[-1] for row in plan)
+    assert 'exposes_created' in details
+    assert 'TEMP B-TREE' not in details
+
+def test_prune_applies_retention_policy():
+    config = StringConfig(string="""
+retention:
+  exposes_max_rows: 5
+  processed_max_age_days: 30
+  executions_max_rows: 2
+  batch_size: 3
+""")
+    id_watch = IdMaintainer(":memory:", config)
+    connection = id_watch.get_connection()
+    start = datetime.datetime(2024, 1, 1)
+    connection.executemany('INSERT INTO exposes (id, created, crawler, details) VALUES (?, ?, ?, ?)',
+                           [(idx, start + datetime.timedelta(hours=idx), 'Immowelt', '{}')
+                            for idx in range(10)])
+    id_watch.mark_processed_many([1, 2], 'Immowelt')
+    connection.execute('INSERT INTO processed (id, crawler, marked) VALUES (3, ?, ?)',
+                       ('Immowelt', start))
+    for _ in range(4):
+        id_watch.update_last_run_time()
+    assert id_watch.prune() == {'exposes': 3, 'processed': 1, 'executions': 2}
+    assert id_watch.prune() == {'exposes': 2, 'processed': 0, 'executions': 0}
+    remaining = [row[0] for row in connection.execute('SELECT id FROM exposes ORDER BY id')]
+    assert remaining == [5, 6, 7, 8, 9]
+    assert id_watch.is_processed_many([1, 2, 3]) == {1, 2}
+    assert connection.execute('SELECT COUNT(*) FROM processed').fetchone()[0] == 2
+    assert id_watch.get_last_run_time() is not None
+
+def test_compact_prunes_and_vacuums_database():
+    with tempfile.TemporaryDirectory() as database_dir:
+        config = StringConfig(string="retention:\n  exposes_max_rows: 10\n  batch_size: 100\n")
+        id_watch = IdMaintainer(os.path.join(database_dir, 'processed_ids.db'), config)
+        id_watch.save_exposes([{'id': idx, 'crawler': 'Immowelt', 'title': 'x' * 1000}
+                               for idx in range(1000)])
+        assert compact(id_watch)['exposes'] == 990
+        connection = id_watch.get_connection()
+        assert connection.execute('SELECT COUNT(*) FROM exposes').fetchone()[0] == 10
+        assert connection.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+        assert connection.execute('PRAGMA freelist_count').fetchone()[0] == 0
+
+def test_exposes_since_are_projected_to_fields():
+    id_watch = IdMaintainer(":memory:")
+    id_watch.save_exposes([{'id': 1, 'crawler': 'Immowelt', 'title': 'Flat',
+                            'price': '900 EUR', 'size': '45 m²'}])
+    saved = id_watch.get_exposes_since(datetime.datetime.now() - datetime.timedelta(seconds=10),
+                                       fields=['price', 'size'])
+    assert len(saved) == 1
+    assert set(saved[0]) == {'price', 'size', 'created_at'}
+
+def test_last_run_time_uses_index():
+    connection = IdMaintainer(":memory:").get_connection()
+    plan = connection.execute("EXPLAIN QUERY PLAN SELECT * FROM executions "
+                              "ORDER BY timestamp DESC LIMIT 1").fetchall()
+    assert 'executions_timestamp' in ' '.join(row[-1] for row in plan)
@@ -0,0 +1,88 @@
+import os
+import pickle
+
+from bs4 import BeautifulSoup
+
+from database.memory_storage import MemoryStorage
+from flathunter.crawler.immobilienscout import Immobilienscout, get_result_count
+from flathunter.crawler.wggesucht import WgGesucht
+from flathunter.hunter import Hunter
+from flathunter.parsing import parse_results_page
+from test.utils.config import StringConfig
+
+FIXTURE = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                       "crawler", "fixtures", "wg-gesucht-spotahome.html")
+
+PARSER_POOL_CONFIG = """
+urls:
+  - https://www.wg-gesucht.de/wohnungen-in-Munchen.90.2.1.0.html
+
+parse:
+  processes: 2
+"""
+
+def read_fixture():
+    with open(FIXTURE, "rb") as fixture:
+        return fixture.read()
+
+def test_parse_results_page_is_picklable():
+    assert pickle.loads(pickle.dumps(parse_results_page)) is parse_results_page
+    entries = parse_results_page(WgGesucht, read_fixture())
+    assert len(entries) == 20
+    assert entries[0]['crawler'] == 'WgGesucht'
+
+def test_strained_parse_matches_full_parse():
+    crawler = WgGesucht(StringConfig(string="urls: []"))
+    strained = BeautifulSoup(read_fixture(), 'lxml', parse_only=WgGesucht.RESULTS_STRAINER)
+    assert strained.find('head') is None
+    full_entries = crawler.extract_data(BeautifulSoup(read_fixture(), 'lxml'))
+    assert parse_results_page(WgGesucht, read_fixture()) == full_entries
+
+IS24_PAGE = """<html><head><title>Wohnungen</title></head><body>
+<h1><span data-is24-qa="resultlist-resultCount">1.234</span> Wohnungen</h1>
+<ul id="resultListItems"><li>
+  <div class="result-list-entry__gallery-container"><div class="gallery-container">
+    <img src="https://pictures.immobilienscout24.de/1.jpg"></div></div>
+  <a class="result-list-entry__brand-title-container" href="/expose/123456789">NEUHelle Wohnung</a>
+  <div class="result-list-entry__address">Mitte, Berlin</div>
+  <dl data-is24-qa="attributes"><dd>1.150 €</dd><dd>62,5 m²</dd><dd>2 Zi.</dd></dl>
+</li></ul><footer>Impressum</footer></body></html>"""
+
+def test_immobilienscout_parses_only_result_list():
+    crawler = Immobilienscout(StringConfig(string="urls: []"))
+    strained = BeautifulSoup(IS24_PAGE, 'lxml', parse_only=Immobilienscout.RESULTS_STRAINER)
+    assert strained.find('footer') is None
+    entries = parse_results_page(Immobilienscout, IS24_PAGE)
+    assert entries == crawler.extract_data(BeautifulSoup(IS24_PAGE, 'lxml'))
+    assert entries[0]['id'] == 123456789
+    assert entries[0]['price'] == '1.150'
+    assert get_result_count(IS24_PAGE.encode('utf-8')) == 1234
+
+def test_parse_in_thread_by_default():
+    crawler = WgGesucht(StringConfig(string="urls: []"))
+    assert crawler.config.parser_pool() is None
+    assert len(crawler._extract_data_from_content(read_fixture())) == 20
+
+def test_parse_in_process_pool():
+    config = StringConfig(string=PARSER_POOL_CONFIG)
+    pool = config.parser_pool()
+    assert pool is not None
+    crawler = WgGesucht(config)
+    try:
+        entries = crawler._extract_data_from_content(read_fixture())
+    finally:
+        pool.shutdown()
+    assert len(entries) == 20
+    assert entries == parse_results_page(WgGesucht, read_fixture())
+
+def test_hunter_starts_and_stops_parser_pool():
+    config = StringConfig(string=PARSER_POOL_CONFIG)
+    hunter = Hunter(config, MemoryStorage())
+    pool = config.parser_pool()
+    assert pool is not None
+    try:
+        assert pool.executor is not None
+        assert len(pool.executor._processes) == 2
+    finally:
+        hunter.close()
+    assert pool.executor is None
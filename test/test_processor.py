@@ -1,11 +1,32 @@
+import os
+import tempfile
+import threading
+import time
 import unittest
 from flathunter.hunter import Hunter
 from database.idmaintainer import IdMaintainer
+from flathunter.abstract_processor import Processor, batched
+from flathunter.default_processors import LambdaProcessor
 from flathunter.processor import ProcessorChain
 from test.dummy_crawler import DummyCrawler
 from test.test_util import count
 from test.utils.config import StringConfig
 
+class BatchRecorder(Processor):
+
+    def __init__(self):
+        self.batches = []
+
+    def process_batch(self, exposes):
+        self.batches.append([expose['id'] for expose in exposes])
+        return exposes
+
+def slow_exposes():
+    for idx in range(6):
+        if idx == 3:
+            time.sleep(0.3)
+        yield {'id': idx}
+
 class ProcessorTest(unittest.TestCase):
 
     DUMMY_CONFIG = """
@@ -18,6 +39,25 @@ google_maps_api:
   enable: true
     """
 
+    PIPELINE_CONFIG = """
+urls:
+  - https://www.example.com/liste/berlin/wohnungen/mieten?roomi=2&prima=1500&wflmi=70&sort=createdate%2Bdesc
+
+pipeline:
+  enabled: true
+  queue_size: 5
+  workers:
+    resolve_addresses: 4
+    """
+
+    BATCH_CONFIG = """
+urls:
+  - https://www.example.com/liste/berlin/wohnungen/mieten?roomi=2&prima=1500&wflmi=70&sort=createdate%2Bdesc
+
+batch:
+  size: 4
+    """
+
     def test_addresses_are_processed_by_hunter(self):
         config = StringConfig(string=self.DUMMY_CONFIG)
         config.set_searchers([DummyCrawler(addresses_as_links=True)])
@@ -40,3 +80,95 @@ google_maps_api:
         exposes = chain.process(exposes)
         for expose in exposes:
             self.assertFalse(expose['address'].startswith('http'), "Expected addresses to be processed")
+
+    def test_pipeline_runs_stage_workers_in_parallel(self):
+        config = StringConfig(string=self.PIPELINE_CONFIG)
+        active = []
+        peak = []
+        lock = threading.Lock()
+        def slow_stage(expose):
+            with lock:
+                active.append(expose['id'])
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.remove(expose['id'])
+            expose['address'] = 'resolved'
+            return expose
+        builder = ProcessorChain.builder(config)
+        builder.add_stage(LambdaProcessor(config, slow_stage), 'resolve_addresses')
+        chain = builder.map(lambda expose: expose).build()
+        exposes = list(chain.process({'id': idx} for idx in range(20)))
+        self.assertEqual(sorted(expose['id'] for expose in exposes), list(range(20)))
+        self.assertTrue(all(expose['address'] == 'resolved' for expose in exposes))
+        self.assertTrue(max(peak) > 1, "Expected stage workers to overlap")
+
+    def test_pipeline_raises_processor_errors(self):
+        config = StringConfig(string=self.PIPELINE_CONFIG)
+        def failing_stage(expose):
+            raise ValueError("Broken expose %d" % expose['id'])
+        chain = ProcessorChain.builder(config).map(failing_stage).build()
+        with self.assertRaises(ValueError):
+            list(chain.process({'id': idx} for idx in range(20)))
+
+    def test_hunter_with_pipeline(self):
+        config = StringConfig(string=self.DUMMY_CONFIG)
+        config.set_searchers([DummyCrawler(addresses_as_links=True)])
+        expected = Hunter(config, IdMaintainer(":memory:")).hunt_flats()
+        config = StringConfig(string=self.PIPELINE_CONFIG)
+        config.set_searchers([DummyCrawler(addresses_as_links=True)])
+        # the pipeline stages run in their own threads, so they need a shared database file
+        with tempfile.TemporaryDirectory() as database_dir:
+            id_watch = IdMaintainer(os.path.join(database_dir, 'processed_ids.db'))
+            exposes = Hunter(config, id_watch).hunt_flats()
+        self.assertTrue(count(exposes) > 4, "Expected to find exposes")
+        for expose in exposes:
+            self.assertFalse(expose['address'].startswith('http'))
+        self.assertEqual(sorted(expose['id'] for expose in exposes),
+                         sorted(expose['id'] for expose in expected))
+
+    def test_batches_are_passed_to_batch_processors(self):
+        config = StringConfig(string=self.BATCH_CONFIG)
+        recorder = BatchRecorder()
+        builder = ProcessorChain.builder(config)
+        builder.add_stage(recorder)
+        chain = builder.map(lambda expose: expose).build()
+        exposes = list(chain.process({'id': idx} for idx in range(10)))
+        self.assertEqual([expose['id'] for expose in exposes], list(range(10)))
+        self.assertEqual(recorder.batches, [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
+        self.assertEqual(chain.processors[1].batch_size, 1)
+
+    def test_incomplete_batches_are_flushed_after_timeout(self):
+        recorder = BatchRecorder()
+        recorder.set_batching(4, flush_timeout=0.05)
+        exposes = list(recorder.process_exposes(slow_exposes()))
+        self.assertEqual(len(exposes), 6)
+        self.assertEqual(recorder.batches, [[0, 1, 2], [3, 4, 5]])
+
+    def test_batch_reader_stops_when_batches_are_not_consumed(self):
+        pulled = []
+        def endless_exposes():
+            while True:
+                pulled.append(len(pulled))
+                time.sleep(0.01)
+                yield {'id': len(pulled)}
+        batches = batched(endless_exposes(), 2, flush_timeout=1)
+        self.assertEqual(len(next(batches)), 2)
+        batches.close()
+        time.sleep(0.05)
+        stopped_at = len(pulled)
+        time.sleep(0.1)
+        self.assertEqual(len(pulled), stopped_at)
+
+    def test_batches_are_smaller_with_flush_timeout(self):
+        self.assertEqual(StringConfig(string="urls: []").batch_size(), 50)
+        self.assertEqual(StringConfig(string="batch:\n  flush_timeout: 2\n").batch_size(), 10)
+
+    def test_pipeline_passes_batches(self):
+        config = StringConfig(string=self.PIPELINE_CONFIG + "\nbatch:\n  size: 4\n")
+        recorder = BatchRecorder()
+        builder = ProcessorChain.builder(config)
+        builder.add_stage(recorder)
+        exposes = list(builder.build().process({'id': idx} for idx in range(10)))
+        self.assertEqual(len(exposes), 10)
+        self.assertEqual([len(batch) for batch in recorder.batches], [4, 4, 2])
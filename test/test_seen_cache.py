@@ -0,0 +1,53 @@
+from database.idmaintainer import IdMaintainer
+from database.seen_cache import SeenIdCache
+
+def test_ids_are_cached_per_crawler():
+    cache = SeenIdCache(None)
+    cache.add(1, 'Immowelt')
+    cache.add_many([2, 3])
+    assert cache.contains(1, 'Immowelt')
+    assert cache.contains(1)
+    assert not cache.contains(1, 'WgGesucht')
+    assert cache.contains(2, 'WgGesucht')
+    assert not cache.contains(4)
+
+def test_pending_ids_are_merged_into_sorted_array():
+    cache = SeenIdCache(None)
+    cache.add_many(range(SeenIdCache.MERGE_THRESHOLD, 0, -1), 'Immowelt')
+    assert len(cache.pending_ids) == 0
+    assert list(cache.sorted_ids['Immowelt']) == list(range(1, SeenIdCache.MERGE_THRESHOLD + 1))
+    cache.add(0, 'Immowelt')
+    assert cache.contains(0, 'Immowelt')
+    assert cache.contains(SeenIdCache.MERGE_THRESHOLD, 'Immowelt')
+    assert not cache.contains(SeenIdCache.MERGE_THRESHOLD + 1, 'Immowelt')
+    assert len(cache) == SeenIdCache.MERGE_THRESHOLD + 1
+
+def test_cache_is_warmed_once():
+    calls = []
+    def loader():
+        calls.append(1)
+        return [(5, 'Immowelt'), (6, None)]
+    cache = SeenIdCache(loader)
+    assert cache.contains(5, 'Immowelt')
+    assert cache.contains(6, 'WgGesucht')
+    assert not cache.contains(5, 'WgGesucht')
+    assert len(calls) == 1
+
+def test_seen_ids_do_not_query_the_database():
+    id_watch = IdMaintainer(":memory:")
+    id_watch.mark_processed_many([1, 2, 3], 'Immowelt')
+    id_watch.seen_cache.warm()
+    statements = []
+    id_watch.get_connection().set_trace_callback(statements.append)
+    assert id_watch.is_processed(2, 'Immowelt')
+    assert id_watch.is_processed_many([1, 3], 'Immowelt') == {1, 3}
+    assert statements == []
+    assert not id_watch.is_processed(4, 'Immowelt')
+    assert len(statements) == 1
+
+def test_cache_is_warmed_from_database():
+    id_watch = IdMaintainer(":memory:")
+    id_watch.mark_processed_many([1, 2, 3], 'Immowelt')
+    id_watch.seen_cache = SeenIdCache(id_watch.get_processed_ids)
+    assert id_watch.is_processed_many([1, 2, 3, 4], 'Immowelt') == {1, 2, 3}
+    assert len(id_watch.seen_cache) == 3
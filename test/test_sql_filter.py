@@ -0,0 +1,63 @@
+import os
+import sqlite3
+import tempfile
+
+from database.idmaintainer import IdMaintainer, MIGRATIONS
+from database.sql_filter import compile_filter, expose_columns
+from flathunter.filter import Filter
+from flathunter.hunter import Hunter
+from test.dummy_crawler import DummyCrawler
+from test.utils.config import StringConfig
+
+FILTERS_CONFIG = """
+filters:
+  max_price: 1500
+  min_size: 40
+  max_rooms: 4
+  max_price_per_square: 30
+  excluded_titles:
+    - "tausch"
+"""
+
+def test_expose_columns_are_parsed_like_filters():
+    expose = {'price': '1.200 €', 'size': '60 m²', 'rooms': '2,5'}
+    assert expose_columns(expose) == (1200.0, 60.0, 2.5, 20.0)
+    assert expose_columns({'price': 'auf Anfrage', 'size': '0 m²'}) == (None, 0.0, None, None)
+
+def test_numeric_filters_compile_to_sql():
+    filter_set = Filter.builder().read_config(StringConfig(string=FILTERS_CONFIG)).build()
+    (condition, params, residual) = compile_filter(filter_set)
+    assert condition == '(price IS NULL OR price <= ?) AND (size IS NULL OR size >= ?) ' \
+                        'AND (rooms IS NULL OR rooms <= ?) AND (pps IS NULL OR pps <= ?)'
+    assert params == [1500, 40, 4, 30]
+    assert residual is not None
+    assert len(residual.filters) == 1
+    assert compile_filter(None) == ('1', [], None)
+
+def test_sql_filters_match_python_filters():
+    config = StringConfig(string="urls:\n  - https://www.example.com/search\n")
+    config.set_searchers([DummyCrawler()])
+    id_watch = IdMaintainer(":memory:")
+    Hunter(config, id_watch).hunt_flats()
+    filter_set = Filter.builder().read_config(StringConfig(string=FILTERS_CONFIG)).build()
+    everything = id_watch.get_recent_exposes(1000)
+    expected = [expose for expose in everything if filter_set.is_interesting_expose(expose)]
+    assert 0 < len(expected) < len(everything)
+    assert id_watch.get_recent_exposes(1000, filter_set=filter_set) == expected
+
+def test_expose_columns_are_backfilled():
+    with tempfile.TemporaryDirectory() as database_dir:
+        db_name = os.path.join(database_dir, 'processed_ids.db')
+        connection = sqlite3.connect(db_name)
+        for statements in MIGRATIONS[:3]:
+            for statement in statements:
+                connection.execute(statement)
+        connection.execute('INSERT INTO exposes (id, created, crawler, details) '
+                           'VALUES (1, ?, ?, ?)', ('2024-01-01 10:00:00', 'Immowelt',
+                           '{"id": 1, "price": "900 EUR", "size": "45 m²", "rooms": "2"}'))
+        connection.execute('PRAGMA user_version = 3')
+        connection.commit()
+        connection.close()
+        row = IdMaintainer(db_name).get_connection() \
+            .execute('SELECT price, size, rooms, pps FROM exposes WHERE id = 1').fetchone()
+        assert row == (900.0, 45.0, 2.0, 20.0)
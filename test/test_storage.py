@@ -0,0 +1,90 @@
+import datetime
+
+import pytest
+
+from database.abstract_storage import Storage
+from database.backends import create_storage
+from database.googlecloud_idmaintainer import GoogleCloudIdMaintainer
+from database.idmaintainer import IdMaintainer
+from database.memory_storage import MemoryStorage
+from flathunter.config import YamlConfig
+from flathunter.exceptions import ConfigException
+from flathunter.filter import Filter
+from flathunter.hunter import Hunter
+from test.dummy_crawler import DummyCrawler
+from test.test_googlecloud_idmaintainer import MockGoogleCloudIdMaintainer
+from test.utils.config import StringConfig
+
+@pytest.fixture(params=['sqlite', 'memory', 'firestore'])
+def storage(request):
+    if request.param == 'sqlite':
+        return IdMaintainer(":memory:")
+    if request.param == 'memory':
+        return MemoryStorage()
+    return MockGoogleCloudIdMaintainer()
+
+def test_backends_implement_storage(storage):
+    assert isinstance(storage, Storage)
+
+def test_processed_ids(storage):
+    storage.mark_processed(1, 'Immowelt')
+    storage.mark_processed_many([2, 3], 'Immowelt')
+    assert storage.is_processed(1, 'Immowelt')
+    assert storage.is_processed(2)
+    assert not storage.is_processed(4, 'Immowelt')
+    assert storage.is_processed_many([1, 2, 3, 4], 'Immowelt') == {1, 2, 3}
+
+def test_exposes_are_saved_and_paged(storage):
+    storage.save_exposes([{'id': expose_id, 'crawler': 'Immowelt', 'title': 'Flat',
+                           'price': f'{expose_id * 100} EUR', 'size': '50 m²', 'rooms': '2'}
+                          for expose_id in range(1, 16)])
+    since = storage.get_exposes_since(datetime.datetime.now() - datetime.timedelta(seconds=10))
+    assert sorted(expose['id'] for expose in since) == list(range(1, 16))
+    filter_set = Filter.builder().read_config(YamlConfig({'filters': {'max_price': 1000}})).build()
+    ids = []
+    (page, cursor) = storage.get_recent_exposes_page(4, filter_set)
+    ids += [expose['id'] for expose in page]
+    while cursor is not None:
+        (page, cursor) = storage.get_recent_exposes_page(4, filter_set, cursor)
+        ids += [expose['id'] for expose in page]
+    assert sorted(ids) == list(range(1, 11))
+    assert len(storage.get_recent_exposes(3)) == 3
+
+def test_user_settings_and_run_times(storage):
+    assert not storage.get_settings_for_user(7)
+    storage.save_settings_for_user(7, {'filters': {'max_price': 1000}})
+    assert storage.get_settings_for_user(7) == {'filters': {'max_price': 1000}}
+    assert storage.get_user_settings() == [(7, {'filters': {'max_price': 1000}})]
+    assert storage.get_last_run_time() is None
+    run_time = storage.update_last_run_time()
+    assert storage.get_last_run_time() == run_time
+
+def test_hunt_runs_against_backend(storage):
+    config = StringConfig(string="urls:\n  - https://www.example.com/search\n")
+    config.set_searchers([DummyCrawler()])
+    exposes = Hunter(config, storage).hunt_flats()
+    assert len(exposes) > 0
+    assert storage.is_processed_many([expose['id'] for expose in exposes]) == \
+        {expose['id'] for expose in exposes}
+
+def test_memory_storage_prunes_exposes():
+    storage = MemoryStorage(YamlConfig({'retention': {'exposes_max_rows': 3,
+                                                      'executions_max_rows': 1}}))
+    storage.save_exposes([{'id': expose_id, 'crawler': 'Immowelt'} for expose_id in range(5)])
+    storage.update_last_run_time()
+    storage.update_last_run_time()
+    assert storage.prune() == {'exposes': 2, 'processed': 0, 'executions': 1}
+    assert [expose['id'] for expose in storage.get_recent_exposes(10)] == [4, 3, 2]
+
+def test_storage_backend_is_selected_from_config(tmp_path):
+    assert isinstance(create_storage(YamlConfig({'storage_backend': 'memory'})), MemoryStorage)
+    assert isinstance(create_storage(YamlConfig({'database_location': str(tmp_path)})),
+                      IdMaintainer)
+    with pytest.raises(ConfigException):
+        create_storage(YamlConfig({'storage_backend': 'mysql'}))
+
+def test_firestore_emulator_needs_no_credentials(monkeypatch):
+    monkeypatch.setenv('FIRESTORE_EMULATOR_HOST', 'localhost:1')
+    id_watch = GoogleCloudIdMaintainer(YamlConfig({'firestore_emulator_host': 'localhost:8200'}))
+    assert id_watch.database.project == GoogleCloudIdMaintainer.EMULATOR_PROJECT_ID
+    assert id_watch.database._emulator_host == 'localhost:8200'
@@ -0,0 +1,72 @@
+import random
+
+from database.idmaintainer import IdMaintainer
+from flathunter.config import YamlConfig
+from flathunter.filter import Filter
+from flathunter.sender_telegram import SenderTelegram
+from flathunter.user_filters import UserFilterMatrix, expose_values
+from flathunter.web_hunter import WebHunter
+from test.dummy_crawler import DummyCrawler
+from test.utils.config import StringConfig
+
+def random_settings(rng):
+    filters = {}
+    for (name, low, high) in [('min_price', 300, 1000), ('max_price', 800, 3000),
+                              ('min_size', 15, 60), ('max_size', 50, 150),
+                              ('min_rooms', 1, 3), ('max_rooms', 2, 5),
+                              ('max_price_per_square', 10, 40)]:
+        if rng.random() < 0.5:
+            filters[name] = rng.randint(low, high)
+    if rng.random() < 0.3:
+        filters['excluded_titles'] = ['tausch']
+    return {'filters': filters}
+
+def test_matches_are_the_same_as_per_user_filters():
+    rng = random.Random(1)
+    users = [(user_id, random_settings(rng)) for user_id in range(200)]
+    exposes = DummyCrawler().get_results('https://www.example.com') * 3
+    matches = UserFilterMatrix(users).match(exposes)
+    for (user_id, settings) in users:
+        filter_set = Filter.builder().read_config(YamlConfig(settings)).build()
+        assert matches[user_id] == list(filter_set.filter(exposes))
+
+def test_unknown_values_pass_all_bounds():
+    expose = {'id': 1, 'title': 'Flat', 'price': 'auf Anfrage', 'size': '50 m²'}
+    (price, size, rooms, pps) = expose_values(expose)
+    assert price != price and rooms != rooms and pps != pps
+    assert size == 50.0
+    matrix = UserFilterMatrix([(1, {'filters': {'max_price': 500, 'min_rooms': 2}}),
+                               (2, {'filters': {'max_size': 40}})])
+    assert matrix.match([expose]) == {1: [expose], 2: []}
+
+def test_no_users_or_exposes():
+    assert UserFilterMatrix([]).match([{'id': 1, 'title': 'x', 'price': '1', 'size': '1',
+                                        'rooms': '1'}]) == {}
+    assert UserFilterMatrix([(1, {})]).match([]) == {1: []}
+
+def test_web_hunter_sends_users_their_matches(mocker):
+    config = StringConfig(string="""
+urls:
+  - https://www.example.com/search
+notifiers:
+  - telegram
+telegram:
+  bot_token: dummy
+""")
+    config.set_searchers([DummyCrawler()])
+    id_watch = IdMaintainer(":memory:")
+    id_watch.save_settings_for_user(1, {'filters': {'max_price': 1000}})
+    id_watch.save_settings_for_user(2, {'filters': {}, 'mute_notifications': True})
+    sent = []
+    def send(sender, expose):
+        sent.append((sender.receiver_ids, expose))
+        return expose
+    mocker.patch.object(SenderTelegram, 'process_expose', send)
+    exposes = WebHunter(config, id_watch).hunt_flats()
+    expected = list(Filter.builder().read_config(YamlConfig({'filters': {'max_price': 1000}}))
+                    .build().filter(exposes))
+    user_messages = [expose for (receivers, expose) in sent if receivers == [1]]
+    assert 0 < len(user_messages) < len(exposes)
+    assert sorted(expose['id'] for expose in user_messages) == \
+        sorted(expose['id'] for expose in expected)
+    assert not any(receivers == [2] for (receivers, _) in sent)
@@ -0,0 +1,50 @@
+import random
+
+from flathunter.user_filters import UserFilterMatrix
+from flathunter.user_index import UserFilterIndex
+from flathunter.web_hunter import WebHunter
+from database.memory_storage import MemoryStorage
+from test.dummy_crawler import DummyCrawler
+from test.test_user_filters import random_settings
+from test.utils.config import StringConfig
+
+def test_index_matches_the_filter_matrix():
+    rng = random.Random(3)
+    users = [(user_id, random_settings(rng)) for user_id in range(300)]
+    exposes = DummyCrawler().get_results('https://www.example.com') * 3
+    assert UserFilterIndex(users).match(exposes) == UserFilterMatrix(users).match(exposes)
+
+def test_users_are_updated_and_removed():
+    index = UserFilterIndex([(1, {'filters': {'max_price': 1000, 'excluded_titles': ['wg']}}),
+                             (2, {'filters': {'min_size': 60}})])
+    flat = {'id': 1, 'title': 'Flat', 'price': '900 EUR', 'size': '50 m²', 'rooms': '2'}
+    shared = dict(flat, id=2, title='WG-Zimmer')
+    assert index.match([flat, shared]) == {1: [flat], 2: []}
+    index.update_user(2, {'filters': {'min_size': 40}})
+    index.update_user(1, {'filters': {'max_price': 800}})
+    assert index.match([flat, shared]) == {1: [], 2: [flat, shared]}
+    assert index.title_patterns == {}
+    index.update_user(2, {'filters': {}, 'mute_notifications': True})
+    assert index.match([flat]) == {1: []}
+    assert all(bounds.users == [] for bounds in index.lower)
+
+def test_web_hunter_keeps_index_up_to_date():
+    storage = MemoryStorage()
+    hunter = WebHunter(StringConfig(string="urls: []\n"), storage)
+    hunter.set_filters_for_user(1, {'max_price': 1000})
+    index = hunter.load_user_index()
+    assert set(index.users) == {1}
+    hunter.set_filters_for_user(2, {'min_size': 50})
+    hunter.set_notification_status(1, False)
+    assert set(index.users) == {2}
+    assert index.users[2][0][1] == 50.0
+
+def test_web_hunter_sees_settings_saved_by_other_workers():
+    storage = MemoryStorage()
+    hunter = WebHunter(StringConfig(string="urls: []\n"), storage)
+    flat = {'id': 1, 'title': 'Flat', 'price': '900 EUR', 'size': '50 m²', 'rooms': '2'}
+    storage.save_settings_for_user(1, {'filters': {'max_price': 1000}})
+    assert hunter.match_users([flat]) == {1: [flat]}
+    storage.save_settings_for_user(1, {'filters': {'max_price': 800}})
+    storage.save_settings_for_user(2, {'filters': {}})
+    assert hunter.match_users([flat]) == {1: [], 2: [flat]}
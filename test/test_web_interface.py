@@ -55,6 +55,14 @@ def test_get_index_with_exposes(hunt_client):
     rv = hunt_client.get('/')
     assert b'<div class="expose' in rv.data
 
+def test_get_index_pages_through_exposes(hunt_client):
+    app.config['HUNTER'].hunt_flats()
+    rv = hunt_client.get('/')
+    assert b'Older offers' in rv.data
+    (_, cursor) = app.config['HUNTER'].get_recent_exposes_page()
+    rv = hunt_client.get('/', query_string={'before': cursor})
+    assert b'<div class="expose' in rv.data
+
 @requests_mock.Mocker(kw='m')
 def test_hunt_with_users(hunt_client, **kwargs):
     m = kwargs['m']